@@ -0,0 +1,97 @@
+'''
+Check that card images are uploaded once and then reused
+
+Run it from the repository root with ``python -m benchmarks.card_art``.
+Games are played against a FakeBot with CardArt set, every card being
+hidden, shown, hidden again and deleted. They're played in three phases:
+with an empty cache, after a restart reading the cache file, and after
+Telegram stopped accepting the cached file_ids. Each phase must upload
+only the images it had no usable file_id for, once each.
+'''
+import asyncio
+import os
+import tempfile
+
+from coupdbot.__main__ import routes
+from coupdbot.admission import AdmissionControl
+from coupdbot.bot import CoupBot
+from coupdbot.card_art import BACK, CardArt
+from coupdbot.cards import Card
+
+from .fake_bot import FakeBot, callback, game_messages
+
+
+N_GAMES = 5
+N_PLAYERS = 4
+
+
+async def play(bot: FakeBot, card_art: CardArt):
+    '''
+    Play N_GAMES games one after the other
+
+    Args:
+        bot: FakeBot answering the API calls
+        card_art: CardArt used to send the cards
+    '''
+    coup_bot = CoupBot(
+        bot,
+        'coupdbot',
+        admission=AdmissionControl(user_burst=1e9, group_burst=1e9),
+        card_art=card_art,
+    )
+    route = routes(coup_bot)
+    user_ids = list(range(1, N_PLAYERS + 1))
+
+    for _ in range(N_GAMES):
+        for message in game_messages(-1, user_ids):
+            await route(message)
+        while coup_bot.sessions.cards:
+            user_id = min(coup_bot.sessions.cards)
+            message_id = min(coup_bot.sessions.cards[user_id])
+            for data in ('/hide', '/show', '/hide', '/delete'):
+                await route(callback(data, user_id, message_id))
+
+
+def phase(name: str, bot: FakeBot, card_art: CardArt):
+    '''
+    Play the games of a phase and check the uploads it made
+
+    Args:
+        name: Name of the phase, to be printed
+        bot: FakeBot answering the API calls
+        card_art: CardArt used to send the cards
+    '''
+    uploads = bot.calls.get('upload', 0)
+    before = dict(card_art.file_ids)
+
+    asyncio.run(play(bot, card_art))
+
+    uploads = bot.calls.get('upload', 0) - uploads
+    uploaded = {
+        image for image, file_id in card_art.file_ids.items()
+        if before.get(image) != file_id
+    }
+    print(f'{name:<16}{uploads:>8}{len(card_art.file_ids):>8}')
+    assert uploads == len(uploaded), 'an image was uploaded more than once'
+
+
+def main():
+    '''
+    Run the three phases
+    '''
+    with tempfile.TemporaryDirectory() as directory:
+        for image in [card.name for card in Card] + [BACK]:
+            with open(os.path.join(directory, f'{image.lower()}.png'), 'wb'):
+                pass
+        cache_file = os.path.join(directory, 'file_ids.json')
+        bot = FakeBot()
+
+        print(f'{"phase":<16}{"uploads":>8}{"images":>8}')
+        phase('empty cache', bot, CardArt(directory, cache_file))
+        phase('restart', bot, CardArt(directory, cache_file))
+        bot.file_ids.clear()
+        phase('expired ids', bot, CardArt(directory, cache_file))
+
+
+if __name__ == '__main__':
+    main()
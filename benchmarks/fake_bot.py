@@ -0,0 +1,236 @@
+'''
+A stand-in for telepot's Bot that answers API calls locally
+'''
+import asyncio
+import itertools
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import telepot.aio.api
+from aiohttp import web
+from telepot.exception import TelegramError
+
+
+@dataclass
+class FakeBot:
+    '''
+    Class FakeBot answers the Bot API calls used by CoupBot without
+    network access, yielding to the event loop on every call. Uploaded
+    photos get a new file_id, which is accepted by later calls until
+    it's removed from file_ids
+
+    Attributes:
+        message_ids: Source of ids for sent messages
+        calls: How many times each API method was called
+        file_ids: file_ids issued for uploaded photos
+    '''
+    message_ids: Iterator[int] = field(default_factory=itertools.count)
+    calls: Dict[str, int] = field(default_factory=lambda: {})
+    file_ids: Set[str] = field(default_factory=set)
+
+    async def call(self, method: str):
+        '''
+        Count an API call and yield to the event loop
+
+        Args:
+            method: Name of the API method
+        '''
+        self.calls[method] = self.calls.get(method, 0) + 1
+        await asyncio.sleep(0)
+
+    async def getMe(self):
+        await self.call('getMe')
+        return {'username': 'coupdbot'}
+
+    async def sendMessage(self, chat_id, text, *_, **__):
+        await self.call('sendMessage')
+        return {'message_id': next(self.message_ids), 'chat': {'id': chat_id}}
+
+    async def editMessageText(self, msg_identifier, text, *_, **__):
+        await self.call('editMessageText')
+        return {'message_id': msg_identifier[1]}
+
+    async def deleteMessage(self, msg_identifier):
+        await self.call('deleteMessage')
+        return True
+
+    def photo(self, photo):
+        '''
+        Get the file_id of a photo, issuing one if it's an upload
+
+        Args:
+            photo: file_id of a photo, or a file to upload
+        Returns:
+            A list of photo sizes, like in a Telegram message
+        '''
+        if isinstance(photo, str):
+            if photo not in self.file_ids:
+                raise TelegramError(
+                    'Bad Request: wrong file identifier/HTTP URL specified',
+                    400,
+                    {},
+                )
+            file_id = photo
+        else:
+            self.calls['upload'] = self.calls.get('upload', 0) + 1
+            file_id = f'file-{len(self.file_ids)}-{next(self.message_ids)}'
+            self.file_ids.add(file_id)
+        return [{'file_id': file_id}]
+
+    async def sendPhoto(self, chat_id, photo, *_, **__):
+        await self.call('sendPhoto')
+        return {
+            'message_id': next(self.message_ids),
+            'chat': {'id': chat_id},
+            'photo': self.photo(photo),
+        }
+
+    async def _api_request(self, method, params=None, files=None, **_):
+        await self.call(method)
+        media = json.loads(params['media'])['media']
+        if media.startswith('attach://'):
+            media = files[media[len('attach://'):]]
+        return {
+            'message_id': params['message_id'],
+            'chat': {'id': params['chat_id']},
+            'photo': self.photo(media),
+        }
+
+
+@dataclass
+class FakeBotAPI:
+    '''
+    Class FakeBotAPI is a local HTTP server answering the Bot API calls
+    used by CoupBot, so telepot's real Bot and HTTP client can be used
+    without reaching Telegram. It's started with start, which points
+    telepot at it
+
+    Attributes:
+        message_ids: Source of ids for sent messages
+        calls: How many times each API method was called
+        runner: Runner of the HTTP server, while it's started
+    '''
+    message_ids: Iterator[int] = field(default_factory=itertools.count)
+    calls: Dict[str, int] = field(default_factory=lambda: {})
+    runner: Optional[web.AppRunner] = None
+
+    async def answer(self, request: web.Request):
+        '''
+        Answer an API call with a minimal result
+
+        Args:
+            request: HTTP request made by telepot
+        Returns:
+            The HTTP response
+        '''
+        method = request.match_info['method']
+        params = await request.post()
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == 'getMe':
+            result: Any = {'id': 1, 'is_bot': True, 'first_name': 'Coup',
+                           'username': 'coupdbot'}
+        elif method == 'deleteMessage':
+            result = True
+        elif method == 'getUpdates':
+            # Long polling with no updates coming
+            await asyncio.sleep(float(params.get('timeout', 0)))
+            result = []
+        else:
+            result = {
+                'message_id': next(self.message_ids),
+                'date': 0,
+                'chat': {'id': int(params['chat_id']), 'type': 'private'},
+            }
+        return web.json_response({'ok': True, 'result': result})
+
+    async def start(self, port: int = 0):
+        '''
+        Start the server on localhost and send telepot's calls to it
+
+        Args:
+            port: Port to listen on, any free one by default
+        '''
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.answer)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', port)
+        await site.start()
+        port = self.runner.addresses[0][1]
+
+        def method_url(request, **_):
+            token, method, _, _ = request
+            return f'http://127.0.0.1:{port}/bot{token}/{method}'
+
+        telepot.aio.api._methodurl = method_url  # pylint: disable=protected-access
+
+    async def stop(self):
+        '''
+        Stop the server
+        '''
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+def command(text: str, user_id: int, chat_id: int):
+    '''
+    Make a message with a command sent by a user
+
+    Args:
+        text: Text of the message
+        user_id: Id of the user sending it
+        chat_id: Id of the chat where it's sent
+    Returns:
+        a dict containing message data
+    '''
+    return {
+        'message_id': 1,
+        'chat': {'id': chat_id, 'type': 'group'},
+        'from': {'id': user_id, 'first_name': f'Player {user_id}'},
+        'text': text,
+    }
+
+
+def callback(data: str, user_id: int, message_id: int):
+    '''
+    Make a callback query sent by pressing a card button
+
+    Args:
+        data: Data of the pressed button
+        user_id: Id of the user pressing it
+        message_id: Id of the card message
+    Returns:
+        a dict containing callback query data
+    '''
+    return {
+        'id': str(message_id),
+        'from': {'id': user_id, 'first_name': f'Player {user_id}'},
+        'data': data,
+        'message': {
+            'message_id': message_id,
+            'chat': {
+                'id': user_id,
+                'type': 'private',
+                'first_name': f'Player {user_id}',
+            },
+        },
+    }
+
+
+def game_messages(group_id: int, user_ids: List[int]) -> List[Dict[str, Any]]:
+    '''
+    Make the messages needed to create, join and start a game
+
+    Args:
+        group_id: Id of the group where the game runs
+        user_ids: Ids of the players
+    Returns:
+        The messages, in the order they must be handled
+    '''
+    return (
+        [command('/new_game', user_ids[0], group_id)]
+        + [command('/join', user_id, group_id) for user_id in user_ids]
+        + [command('/start', user_ids[0], group_id)]
+    )
@@ -0,0 +1,88 @@
+'''
+Compare the API calls a game makes with and without hand_view
+
+Run it from the repository root with ``python -m benchmarks.hand_view``.
+The same random games are played against a FakeBot once with a message
+per card and once with hand_view: a player uses foreign aid, then random
+players hide, show and remove random cards until the game is over.
+'''
+import asyncio
+import random
+from typing import Dict
+
+from coupdbot.__main__ import routes
+from coupdbot.admission import AdmissionControl
+from coupdbot.bot import CoupBot
+
+from .fake_bot import FakeBot, callback, command, game_messages
+
+
+N_GAMES = 200
+N_PLAYERS = 4
+METHODS = ('sendMessage', 'editMessageText', 'deleteMessage')
+
+
+async def play(hand_view: bool, seed: int):
+    '''
+    Play a random game
+
+    Args:
+        hand_view: Wheter each hand is a single message
+        seed: Seed of the game's random choices
+    Returns:
+        How many times each API method was called
+    '''
+    random.seed(seed)
+    bot = FakeBot()
+    coup_bot = CoupBot(
+        bot,
+        'coupdbot',
+        admission=AdmissionControl(user_burst=1e9, group_burst=1e9),
+        hand_view=hand_view,
+    )
+    route = routes(coup_bot)
+    user_ids = list(range(1, N_PLAYERS + 1))
+
+    for message in game_messages(-1, user_ids):
+        await route(message)
+    await route(command('Foreign aid', user_ids[0], -1))
+
+    sessions = coup_bot.sessions
+    while sessions.games:
+        user_id = random.choice(sorted(sessions.user_games))
+        player = sessions.user_games[user_id].player(user_id)
+        if hand_view:
+            message_id = sessions.hands[user_id]
+            card = random.choice(player.hand())
+        else:
+            message_id = random.choice(sorted(sessions.cards[user_id]))
+            card = sessions.card(user_id, message_id)
+
+        action = random.choice(('hide', 'show', 'delete'))
+        if action != 'delete':
+            action = 'show' if player.is_hidden(card) else 'hide'
+        data = f'/{action} {int(card)}' if hand_view else f'/{action}'
+        await route(callback(data, user_id, message_id))
+
+    return bot.calls
+
+
+def main():
+    '''
+    Print the average API calls per game of both modes
+    '''
+    print(f'{"mode":<10}' + ''.join(f'{method:>17}' for method in METHODS))
+    for hand_view in (False, True):
+        calls: Dict[str, int] = {}
+        for seed in range(N_GAMES):
+            for method, count in asyncio.run(play(hand_view, seed)).items():
+                calls[method] = calls.get(method, 0) + count
+
+        name = 'hand view' if hand_view else 'per card'
+        print(f'{name:<10}' + ''.join(
+            f'{calls.get(method, 0) / N_GAMES:>17.1f}' for method in METHODS
+        ))
+
+
+if __name__ == '__main__':
+    main()
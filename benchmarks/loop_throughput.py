@@ -0,0 +1,114 @@
+'''
+Compare handler throughput between asyncio's and uvloop's event loops
+
+Run it from the repository root with ``python -m benchmarks.loop_throughput``.
+Every game is created, joined, started, has half of its players use foreign
+aid (more would empty the deck) and is then force ended, with the games
+running concurrently. Games are played against a FakeBot, which measures
+the handlers alone, and through telepot's Bot and HTTP client against a
+FakeBotAPI server, which is how the bot runs.
+'''
+import asyncio
+import time
+
+from telepot.aio import Bot
+
+from coupdbot.__main__ import routes
+from coupdbot.admission import AdmissionControl
+from coupdbot.bot import CoupBot
+from coupdbot.runtime import close_http_pool, open_http_pool
+
+from .fake_bot import FakeBot, FakeBotAPI, command, game_messages
+
+
+N_GAMES = 2000
+N_HTTP_GAMES = 200
+N_PLAYERS = 4
+
+
+async def play(route, group_id: int):
+    '''
+    Play a game through the routed handlers
+
+    Args:
+        route: Function that handles a message, made by routes
+        group_id: Id of the group where the game runs
+    Returns:
+        How many messages were handled
+    '''
+    user_ids = [group_id * 100 + i for i in range(N_PLAYERS)]
+    messages = game_messages(-group_id, user_ids)
+    messages += [command('Foreign aid', user_id, -group_id)
+                 for user_id in user_ids[:N_PLAYERS // 2]]
+    messages.append(command('/force_endgame', user_ids[0], -group_id))
+
+    for message in messages:
+        await route(message)
+    return len(messages)
+
+
+async def run(http: bool):
+    '''
+    Play concurrent games
+
+    Args:
+        http: Wheter to go through telepot's HTTP client
+    Returns:
+        Handled messages per second and bot API calls per second
+    '''
+    if http:
+        n_games = N_HTTP_GAMES
+        api = FakeBotAPI()
+        await api.start()
+        await open_http_pool()
+        bot = Bot('0:benchmark')
+        calls = api.calls
+    else:
+        n_games = N_GAMES
+        bot = FakeBot()
+        calls = bot.calls
+
+    coup_bot = CoupBot(
+        bot,
+        'coupdbot',
+        admission=AdmissionControl(user_burst=1e9, group_burst=1e9),
+    )
+    route = routes(coup_bot)
+
+    start = time.perf_counter()
+    handled = await asyncio.gather(
+        *(play(route, group_id) for group_id in range(1, n_games + 1))
+    )
+    elapsed = time.perf_counter() - start
+
+    if http:
+        await close_http_pool()
+        await api.stop()
+
+    return sum(handled) / elapsed, sum(calls.values()) / elapsed
+
+
+def main():
+    '''
+    Run the benchmark on each available event loop
+    '''
+    loops = [('asyncio', asyncio.new_event_loop)]
+    try:
+        import uvloop  # pylint: disable=import-outside-toplevel
+        loops.append(('uvloop', uvloop.new_event_loop))
+    except ImportError:
+        print('uvloop is not installed, only asyncio will be measured')
+
+    print(f'{"loop":<10}{"client":<8}{"handlers/s":>12}{"api calls/s":>13}')
+    for name, new_event_loop in loops:
+        for http in (False, True):
+            loop = new_event_loop()
+            asyncio.set_event_loop(loop)
+            handlers, calls = loop.run_until_complete(run(http))
+            loop.close()
+            client = 'http' if http else 'fake'
+            print(f'{name:<10}{client:<8}{handlers:>12.0f}{calls:>13.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+'''
+Measure how many bytes an idle game and a registered player take
+
+Run it from the repository root with ``python -m benchmarks.memory``.
+The ``legacy`` column reproduces the previous layout: plain dataclasses
+holding lists of Card members, indexed by the ``games`` and
+``player_to_game`` dicts CoupBot used to keep. The ``compact`` column
+goes through SessionRegistry, so its indexes are measured too.
+'''
+import gc
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from coupdbot.sessions import SessionRegistry
+
+
+N_GAMES = 20000
+N_PLAYERS = 4
+
+
+@dataclass
+class LegacyPlayer:
+    '''
+    Player layout before the compact state
+    '''
+    id: int
+    name: str
+    cards: List = field(default_factory=lambda: [])
+    hidden_cards: List = field(default_factory=lambda: [])
+    foreign_aid_cards: int = 0
+
+
+@dataclass
+class LegacyGame:
+    '''
+    Game layout before the compact state
+    '''
+    group_id: int
+    players: Dict[int, LegacyPlayer] = field(default_factory=lambda: {})
+    deck: List = field(default_factory=lambda: [])
+    started: bool = False
+
+
+def legacy(group_ids, user_ids):
+    '''
+    Create games and join players the way CoupBot used to
+
+    Args:
+        group_ids: Id of each group with a game
+        user_ids: Ids of the users joining each game
+    Returns:
+        The games and player indexes
+    '''
+    games = {}
+    player_to_game = {}
+    for group_id, users in zip(group_ids, user_ids):
+        game = games[group_id] = LegacyGame(group_id)
+        for user_id in users:
+            game.players[user_id] = LegacyPlayer(user_id, 'Player')
+            player_to_game[user_id] = game
+    return games, player_to_game
+
+
+def compact(group_ids, user_ids):
+    '''
+    Create games and join players the way CoupBot does
+
+    Args:
+        group_ids: Id of each group with a game
+        user_ids: Ids of the users joining each game
+    Returns:
+        The SessionRegistry
+    '''
+    sessions = SessionRegistry()
+    for group_id, users in zip(group_ids, user_ids):
+        sessions.add_game(group_id)
+        for user_id in users:
+            game = sessions.game(group_id)
+            game.add_player(user_id, 'Player')
+            sessions.add_user(user_id, game)
+    return sessions
+
+
+def measure(create, n_players):
+    '''
+    Measure the memory allocated by creating many games
+
+    Args:
+        create: Function that creates the games, like legacy or compact
+        n_players: How many players join each game
+    Returns:
+        Allocated bytes per game
+    '''
+    group_ids = [-10**12 - i for i in range(N_GAMES)]
+    user_ids = [
+        [10**9 + i * N_PLAYERS + j for j in range(n_players)]
+        for i in range(N_GAMES)
+    ]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = create(group_ids, user_ids)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del state
+
+    return (after - before) / N_GAMES
+
+
+def main():
+    '''
+    Print the bytes per idle game and per player of both layouts
+    '''
+    results = []
+    for create in (legacy, compact):
+        idle = measure(create, 0)
+        full = measure(create, N_PLAYERS)
+        results.append((idle, (full - idle) / N_PLAYERS))
+
+    print(f'{"":<10}{"legacy":>10}{"compact":>10}{"ratio":>8}')
+    for name, legacy_bytes, compact_bytes in zip(('idle game', 'player'), *results):
+        ratio = legacy_bytes / compact_bytes
+        print(f'{name:<10}{legacy_bytes:>10.0f}{compact_bytes:>10.0f}{ratio:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,38 @@
 import asyncio
+import os
+from typing import Optional
 
-from carl import command
+from carl import Arg, command
 from telepot.aio import Bot
 from telepot.aio.helper import Router
-from telepot.aio.loop import MessageLoop
 
 from .bot import CoupBot
+from .card_art import CardArt
+from .history import History
+from .profiling import Profiler
+from .runtime import Runtime, close_http_pool, install_uvloop, open_http_pool, serve
+from .tracing import TracedBot, Tracer
 
 
-def routes(coup_bot: CoupBot):
+def routes(coup_bot: CoupBot, profiler: Optional[Profiler] = None):
     '''
     Set routes to call functions when a command is read
 
     Args:
         coup_bot: The CoupBot instance that will be executed
+        profiler: Profiler used by /profile. Bots running in the same
+        process must share it. A new one is made if not given
     '''
     routes = {
-        x: getattr(coup_bot, x)
+        x: coup_bot.admission.wrap(x, getattr(coup_bot, x))
         for x in
         ['new_game', 'join', 'start', 'actions', 'hide', 'show',
          'delete', 'foreign_aid', 'force_endgame', 'quit_game',
-         'help', 'rules', 'status']
+         'help', 'rules', 'status', 'stats', 'profile', 'metrics']
     }
     routes[None] = coup_bot.default
+    coup_bot.profiler = profiler if profiler is not None else Profiler()
+    coup_bot.profiler.add(routes)
 
     router = Router(
         coup_bot.read_command,
@@ -31,26 +41,114 @@ def routes(coup_bot: CoupBot):
 
     return router.route
 
+
+def bot_path(path: Optional[str], name: str):
+    '''
+    Get the path of a file kept by a single bot, when several bots run
+    in the same process
+
+    Args:
+        path: Path given in the command line, if any
+        name: Username of the bot
+    Returns:
+        The path with the bot username before its extension
+    '''
+    if path is None:
+        return None
+    root, extension = os.path.splitext(path)
+    return f'{root}.{name}{extension}'
+
+
 @command
-async def main(token):
+async def main(
+        tokens: Arg(nargs='+'),
+        admins='',
+        profile_dir='.',
+        state_file: str = None,
+        drain_timeout: float = 10.0,
+        trace_file: str = None,
+        trace_sample_rate: float = 0.01,
+        handoff_socket: str = None,
+        history_file: str = None,
+        card_art_dir: str = None,
+        card_art_cache: str = None,
+        hand_view: Arg('--hand_view', action='store_true') = False,
+        uvloop: Arg('--uvloop', action='store_true') = False,
+):
     '''
-    Start the bot main loop
+    Start the bots main loop. It runs until SIGTERM or SIGINT is received
 
     Args:
-        token: token of the bot created with BotFather
+        tokens: tokens of the bots created with BotFather. Each bot keeps
+        its own games and rate limits, and with several bots the bot
+        username is added to state_file, handoff_socket and card_art_cache
+        admins: comma separated ids of the users allowed to /profile
+        profile_dir: directory where /profile dumps its profiles
+        state_file: file where running games are saved on exit and
+        loaded from on start
+        drain_timeout: seconds to wait for running handlers on exit
+        trace_file: JSON lines file where traces of handled updates
+        are written
+        trace_sample_rate: fraction of the updates that are traced
+        handoff_socket: unix socket where a running bot waits for its
+        replacement. If a bot is running there, this one takes over
+        history_file: SQLite file where finished games are stored
+        card_art_dir: directory with card images, cards are sent as
+        text without it
+        card_art_cache: JSON file where the file_ids of uploaded card
+        images are saved
+        hand_view: send each player's hand as a single message, edited
+        as cards change. Cards are sent as text in this mode
+        uvloop: use uvloop's event loop, it's selected before main runs
     '''
-    bot = Bot(token)
-    coup_bot = CoupBot(bot, (await bot.getMe())['username'])
-    loop = asyncio.get_event_loop()
-    loop.create_task(
-        MessageLoop(
-            coup_bot.bot,
-            routes(coup_bot)
-        ).run_forever()
-    )
+    admin_ids = {int(x) for x in admins.split(',') if x}
+    history = History(history_file) if history_file else None
+    tracer = Tracer(trace_file, trace_sample_rate) if trace_file else None
+    profiler = Profiler(profile_dir)
+
+    async def prepare(token):
+        bot = Bot(token)
+        if tracer is not None:
+            bot = TracedBot(bot)
+        name = (await bot.getMe())['username']
+
+        paths = [state_file, handoff_socket, card_art_cache]
+        if len(tokens) > 1:
+            paths = [bot_path(path, name) for path in paths]
+        bot_state_file, bot_handoff_socket, bot_card_art_cache = paths
+
+        coup_bot = CoupBot(
+            bot,
+            name,
+            admins=admin_ids,
+            history=history,
+            card_art=(
+                CardArt(card_art_dir, bot_card_art_cache)
+                if card_art_dir else None
+            ),
+            hand_view=hand_view,
+        )
+        route = routes(coup_bot, profiler)
+        if tracer is not None:
+            route = tracer.wrap(route)
+        runtime = Runtime(
+            coup_bot, route, bot_state_file, drain_timeout, bot_handoff_socket
+        )
+        if not await runtime.take_over():
+            runtime.restore()
+        return runtime
+
+    await open_http_pool(bots=len(tokens))
+    try:
+        await serve([prepare(token) for token in tokens])
+    finally:
+        await close_http_pool()
+        if tracer is not None:
+            await tracer.close()
 
 
 if __name__ == '__main__':
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(main.run_async())
-    loop.run_forever()
+    arguments = main.parse_args()
+    if arguments.uvloop:
+        install_uvloop()
+    asyncio.run(main.resume_async(arguments))
@@ -0,0 +1,205 @@
+import time
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple
+
+from .metrics import METRICS, Metrics
+
+
+CRITICAL_COMMANDS = frozenset(['hide', 'show', 'delete', 'foreign_aid'])
+LOW_PRIORITY_COMMANDS = frozenset(['rules', 'help', 'actions'])
+
+
+@dataclass
+class TokenBucket:
+    '''
+    Class TokenBucket limits how often something can happen
+
+    Args:
+        rate: How many tokens are refilled per second
+        burst: Maximum number of tokens
+
+    Attributes:
+        rate: How many tokens are refilled per second
+        burst: Maximum number of tokens
+        tokens: How many tokens are available
+        updated: When tokens were last refilled
+    '''
+    rate: float
+    burst: float
+    tokens: float = field(init=False)
+    updated: float = field(init=False)
+
+    def __post_init__(self):
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float):
+        '''
+        Try to take a token
+
+        Args:
+            now: Current monotonic time
+        Returns:
+            Wheter a token was available
+        '''
+        elapsed = now - self.updated
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        return True
+
+    def full(self, now: float):
+        '''
+        Check if the bucket would be full by now
+
+        Args:
+            now: Current monotonic time
+        Returns:
+            Wheter the bucket is full
+        '''
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+@dataclass
+class AdmissionControl:
+    '''
+    The AdmissionControl decides which commands get handled. Gameplay
+    critical commands are always handled, low priority ones are shed
+    while too many handlers are running, and the rest is throttled
+    per user and per group
+
+    Attributes:
+        user_rate: Commands per second allowed to each user
+        user_burst: Commands a user can send at once
+        group_rate: Commands per second allowed in each group
+        group_burst: Commands that can be sent at once in a group
+        max_load: Number of running handlers above which low priority
+        commands are shed
+        max_buckets: Number of token buckets above which the full ones
+        are dropped
+        prune_interval: Minimum seconds between two prunes, so a lot of
+        busy buckets don't make every command walk all of them
+        metrics: Where the decisions are counted
+        load: Number of handlers running right now
+        buckets: Map from ('user' or 'group', id) to its token bucket
+        pruned: When buckets were last pruned
+    '''
+    user_rate: float = 0.5
+    user_burst: float = 5.0
+    group_rate: float = 2.0
+    group_burst: float = 10.0
+    max_load: int = 20
+    max_buckets: int = 10000
+    prune_interval: float = 60.0
+    metrics: Metrics = field(default_factory=lambda: METRICS)
+    load: int = 0
+    buckets: Dict[Tuple[str, int], TokenBucket] = field(
+        default_factory=lambda: {}
+    )
+    pruned: float = float('-inf')
+
+    def admit(self, command: str, message: Dict[str, Any]):
+        '''
+        Decide if a command will be handled
+
+        Args:
+            command: Name of the command
+            message: a dict containing message data
+        Returns:
+            The decision: 'critical', 'admitted', 'shed' or 'throttled'
+        '''
+        if command in CRITICAL_COMMANDS:
+            return 'critical'
+
+        if command in LOW_PRIORITY_COMMANDS and self.load >= self.max_load:
+            return 'shed'
+
+        if 'message' in message:
+            chat_id = message['message']['chat']['id']
+        else:
+            chat_id = message['chat']['id']
+        # Channel posts have no sender, only their chat is throttled
+        user_id = message.get('from', {}).get('id')
+
+        now = time.monotonic()
+        if (
+            len(self.buckets) > self.max_buckets
+            and now - self.pruned >= self.prune_interval
+        ):
+            self.prune(now)
+
+        if user_id is not None:
+            user = self.bucket(
+                'user', user_id, self.user_rate, self.user_burst
+            )
+            if not user.take(now):
+                return 'throttled'
+
+        if chat_id != user_id:
+            group = self.bucket(
+                'group', chat_id, self.group_rate, self.group_burst
+            )
+            if not group.take(now):
+                return 'throttled'
+
+        return 'admitted'
+
+    def bucket(self, kind: str, key: int, rate: float, burst: float):
+        '''
+        Get a token bucket, creating it if needed
+
+        Args:
+            kind: Either 'user' or 'group'
+            key: Id of the user or group
+            rate: Refill rate of a new bucket
+            burst: Size of a new bucket
+        Returns:
+            The token bucket
+        '''
+        bucket = self.buckets.get((kind, key))
+        if bucket is None:
+            bucket = TokenBucket(rate, burst)
+            self.buckets[(kind, key)] = bucket
+        return bucket
+
+    def prune(self, now: float):
+        '''
+        Drop the buckets that are full, as they behave like new ones
+
+        Args:
+            now: Current monotonic time
+        '''
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if not bucket.full(now)
+        }
+        self.pruned = now
+
+    def wrap(self, command: str, handler: Callable):
+        '''
+        Wrap a handler so it's only called when the command is admitted
+
+        Args:
+            command: Name of the command
+            handler: Handler of the command
+        Returns:
+            The wrapped handler
+        '''
+        @wraps(handler)
+        async def admitted(message, *args, **kwargs):
+            decision = self.admit(command, message)
+            self.metrics.inc('admission', command, decision)
+            if decision in ('shed', 'throttled'):
+                return None
+
+            self.load += 1
+            try:
+                return await handler(message, *args, **kwargs)
+            finally:
+                self.load -= 1
+
+        return admitted
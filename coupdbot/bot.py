@@ -1,19 +1,138 @@
+import asyncio
 import re
 from dataclasses import dataclass, field
 from textwrap import dedent
-from typing import Any, Dict
+from typing import Any, Awaitable, Dict, Optional, Sequence, Set
 
 from telepot.aio import Bot
 from telepot.namedtuple import (InlineKeyboardButton, InlineKeyboardMarkup,
                                 KeyboardButton, ReplyKeyboardMarkup)
 
+from .admission import AdmissionControl
+from .card_art import BACK, CardArt
 from .cards import Card
 from .errors import ForeignAidNotFinished, GameAlreadyStarted
-from .game import Game
+from .history import History
+from .ingress import KEYBOARD_COMMANDS
+from .metrics import METRICS
+from .player import Player
+from .profiling import Profiler
+from .sessions import SessionRegistry
 
 
 COMMAND_RE = re.compile(r'/([^@\s]*)(?:@([^\s]*))?(?:\s+(.*))?', re.S)
 
+GAME_EXISTS_TEXT = dedent('''\
+    There's already a game in this chat, finish it firt.
+    Alternatively, you can /force_endgame, but it'll interrupt
+    the current game!
+''')
+
+NEW_GAME_TEXT = dedent('''\
+    A new game is ready! Send a /join to join it.
+    Send a /start here once everybody is in.
+''')
+
+ACTIONS_TEXT = dedent('''\
+    *Influences and its actions*
+    *All* - Get 1 coin. Get 2 coins. Spend 7 coins to give
+    a coup d'etat (kill a influence of a player of your choice).
+    With 10 or more coins, coup d'etat is mandatory.
+    *Duke* - Get 3 coins. Blocks a player of getting 2
+    coins.
+    *Captain* - Steals 2 coins of another player. Blocks
+    ther captains
+    *Embassador* - Asks for foreign aid, buy the number of
+    influeces you possess, eliminates them until you have the number
+    of you had before. Blocks captains.
+    *Assassin* - Kills a influence of a player of your
+    choice for 3 coins.
+    *Duchess* - Blocks assassins.
+''')
+
+HELP_TEXT = dedent('''\
+    */new_game* - Prepare to start a new game.
+    */join* - User joins the game if that match
+    hasn't started.
+    */start* - Start a game in a group.
+    */force_endgame* - Forces the end of the game in a group.
+    */rules* - Send a message with the game's rules.
+    */status* - Send to the group the current state of the
+    game.
+    */stats* - Send how many games you played and won.
+''')
+
+RULES_TEXT = dedent('''\
+    Each player is a member of the french court and possess
+    two influences. Each player playes once per round, on its
+    turn the player performs an action, which actions each influence
+    can perform will be explained at the beginning of the game.
+    When an action from a specific influence is performed, the player
+    must declare "I'm X and I'll do Y", other players com accept or
+    contest, claiming the player doesn't have it influence it claims
+    to have. If the player was really bluffing, it hides its
+    influences and let the contestant player choose a card to delete,
+    otherwise the player shows that it really had that influence and
+    it's the contestant player that hide it's cards and allow a card
+    to be deleted.
+    When a player is a victm of the assassin or a coup d'etat,
+    it must hide it's cards and allow the attacker to choose one to
+    remove.
+    In order to keep the social aspect of the game, this bot
+    doesn't implement coins. This is no obstacle, literally anything
+    can represent coins, from cutted paper to the christmas socks
+    your aunt Barbara gave to you and you never unpacked.
+    Wins the game the last player with at least one influence
+    remaining.
+''')
+
+CARD_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text='Hide', callback_data='/hide'),
+     InlineKeyboardButton(text='Remove', callback_data='/delete')],
+])
+
+HIDDEN_CARD_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text='Show', callback_data='/show'),
+     InlineKeyboardButton(text='Remove', callback_data='/delete')],
+])
+
+GAME_KEYBOARD = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text='Foreign aid'),
+     KeyboardButton(text='Quit game')]
+])
+
+
+def hand_message(player: Player):
+    '''
+    Build the message holding a player's whole hand. Each card gets a
+    line and a row of buttons, whose commands carry the card code
+
+    Args:
+        player: Player holding the hand
+    Returns:
+        The text of the message and its keyboard
+    '''
+    hand = [(card, False) for card in player.cards]
+    hand += [(card, True) for card in player.hidden_cards]
+
+    lines = []
+    rows = []
+    for position, (card, hidden) in enumerate(hand, 1):
+        action = 'show' if hidden else 'hide'
+        lines.append(f'{position}. {"?" if hidden else card.name}')
+        rows.append([
+            InlineKeyboardButton(
+                text=f'{action.title()} {position}',
+                callback_data=f'/{action} {int(card)}'
+            ),
+            InlineKeyboardButton(
+                text=f'Remove {position}',
+                callback_data=f'/delete {int(card)}'
+            ),
+        ])
+
+    return '\n'.join(lines), InlineKeyboardMarkup(inline_keyboard=rows)
+
 
 @dataclass
 class CoupBot:
@@ -26,16 +145,41 @@ class CoupBot:
     Attributes:
         bot: Bot handler
         name: Name of the bot
-        games: Map from group id to its Game object.
-        player_to_game: Map from user id to its game.
-        dealt_cards: Nested map from user_id and message_id to which card
-        that message represents.
+        sessions: Registry of running games, their users and the
+        messages holding their cards
+        admins: Ids of the users allowed to use admin commands
+        profiler: Profiler of the routed handlers, if profiling is enabled
+        admission: Decides which commands get handled under load
+        history: Where finished games are stored, if anywhere
+        card_art: Sends cards as photos, if set. Otherwise cards are
+        sent as text
+        hand_view: Wheter each player's hand is a single text message,
+        edited as cards change, instead of a message per card. It takes
+        precedence over card_art
+        background: Tasks the handlers left running, like history writes
     '''
     bot: Bot
     name: str
-    games: Dict[int, Game] = field(default_factory=lambda: {})
-    player_to_game: Dict[int, Game] = field(default_factory=lambda: {})
-    dealt_cards: Dict[int, Dict[int, Card]] = field(default_factory=lambda: {})
+    sessions: SessionRegistry = field(default_factory=SessionRegistry)
+    admins: Set[int] = field(default_factory=set)
+    profiler: Optional[Profiler] = None
+    admission: AdmissionControl = field(default_factory=AdmissionControl)
+    history: Optional[History] = None
+    card_art: Optional[CardArt] = None
+    hand_view: bool = False
+    background: Set[asyncio.Future] = field(default_factory=set)
+
+    def spawn(self, awaitable: Awaitable):
+        '''
+        Run a coroutine or future without waiting for it, keeping it in
+        background until it's done
+
+        Args:
+            awaitable: Coroutine or future to be run
+        '''
+        future = asyncio.ensure_future(awaitable)
+        self.background.add(future)
+        future.add_done_callback(self.background.discard)
 
     async def new_game(self, message: Dict[str, Any], _):
         '''
@@ -48,23 +192,15 @@ class CoupBot:
         message_id = message['message_id']
         chat_type = message['chat']['type']
 
-        if chat_id in self.games:
-            reply = dedent('''\
-                There's already a game in this chat, finish it firt.
-                Alternatively, you can /force_endgame, but it'll interrupt
-                the current game!
-            ''')
+        if chat_id in self.sessions.games:
+            reply = GAME_EXISTS_TEXT
 
         elif chat_type not in ('group', 'supergroup'):
             reply = 'The game must be started in a group.'
 
         else:
-            game = Game(chat_id)
-            self.games[chat_id] = game
-            reply = dedent('''\
-                A new game is ready! Send a /join to join it.
-                Send a /start here once everybody is in.
-            ''')
+            self.sessions.add_game(chat_id)
+            reply = NEW_GAME_TEXT
 
         await self.bot.sendMessage(
             chat_id,
@@ -88,18 +224,17 @@ class CoupBot:
         if chat_type not in ('group', 'supergroup'):
             reply = 'You must join a game inside a group.'
 
-        elif user_id in self.player_to_game:
+        elif user_id in self.sessions.user_games:
             reply = 'You\'re already in a game.'
 
-        elif chat_id not in self.games:
+        elif chat_id not in self.sessions.games:
             reply = 'The game was not created. Create it using /new_game'
 
         else:
             try:
-                game = self.games[chat_id]
+                game = self.sessions.game(chat_id)
                 game.add_player(user_id, user_name)
-                self.player_to_game[user_id] = game
-                self.dealt_cards[user_id] = {}
+                self.sessions.add_user(user_id, game)
                 reply = 'You joined the game!'
             except GameAlreadyStarted:
                 reply = 'Can\'t join middle game. Finish it or /force_end first'
@@ -122,18 +257,14 @@ class CoupBot:
 
         keyboard_markup = None
         try:
-            game = self.games[chat_id]
+            game = self.sessions.game(chat_id)
             game.start()
-            for user_id in game.players.keys():
-                for _ in range(2):
-                    await self.deal_random_card(user_id)
-
+            for user_id in game.player_ids():
+                cards = [game.deal_card(user_id) for _ in range(2)]
+                await self.deal_cards(user_id, cards)
 
             reply = 'Game started!'
-            keyboard_markup = ReplyKeyboardMarkup(keyboard=[
-                [KeyboardButton(text='Foreign aid'),
-                 KeyboardButton(text='Quit game')]
-            ])
+            keyboard_markup = GAME_KEYBOARD
         except KeyError:
             reply = 'The game was not created. Create it using /new_game'
         except GameAlreadyStarted:
@@ -153,35 +284,105 @@ class CoupBot:
         Args:
             user_id: Id of the user to deal the card to
         '''
-        game = self.player_to_game[user_id]
+        game = self.sessions.user_games[user_id]
         card = game.deal_card(user_id)
-        await self.deal_card(user_id, card)
+        await self.deal_cards(user_id, [card])
 
-    async def deal_card(self, user_id: int, card: Card):
+    async def deal_cards(self, user_id: int, cards: Sequence[Card]):
         '''
-        Send the card to the player's chat
+        Send the cards dealt to a player. With hand_view the message
+        holding the hand is sent or edited once, otherwise each card is
+        sent on its own
 
         Args:
-            user_id: Id to where the card will be sent
-            card: Card that will be sent
+            user_id: Id to where the cards will be sent
+            cards: Cards that were dealt
         '''
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text='Hide',
-                callback_data='/hide'
-            ),
-             InlineKeyboardButton(
-                 text='Remove',
-                 callback_data='/delete'
-             )],
-        ])
+        if self.hand_view:
+            return await self.send_hand(user_id)
+
+        for card in cards:
+            await self.deal_card(user_id, card)
+
+    async def send_hand(self, user_id: int):
+        '''
+        Send the player's whole hand as a single message, or edit the
+        message already holding it
+
+        Args:
+            user_id: Id of the player
+        '''
+        game = self.sessions.user_games[user_id]
+        text, keyboard = hand_message(game.player(user_id))
+        message_id = self.sessions.hands.get(user_id)
+        if message_id is not None:
+            return await self.bot.editMessageText(
+                msg_identifier=(user_id, message_id),
+                text=text,
+                reply_markup=keyboard
+            )
+
         message = await self.bot.sendMessage(
             user_id,
-            card.name,
+            text,
             reply_markup=keyboard
         )
+        self.sessions.add_hand(user_id, message['message_id'])
+
+    def from_hand(self, user_id: int, message_id: int):
+        '''
+        Check if a button was pressed on the message holding the whole
+        hand. Messages sent one per card can still be pressed with
+        hand_view, e.g. if it was turned on while they were in a game
+
+        Args:
+            user_id: Id of the user that pressed the button
+            message_id: Id of the message holding the button
+        Returns:
+            Wheter the message holds the player's whole hand
+        '''
+        return self.sessions.hands.get(user_id) == message_id
+
+    def pressed_card(self, user_id: int, message_id: int, args):
+        '''
+        Get the card a button was pressed for
+
+        Args:
+            user_id: Id of the user that pressed the button
+            message_id: Id of the message holding the button
+            args: Arguments of the button command, the card code when
+            the whole hand is a single message
+        Returns:
+            The card
+        '''
+        if self.from_hand(user_id, message_id):
+            return Card(int(args))
+        return self.sessions.card(user_id, message_id)
+
+    async def deal_card(self, user_id: int, card: Card):
+        '''
+        Send the card to the player's chat
+
+        Args:
+            user_id: Id to where the card will be sent
+            card: Card that will be sent
+        '''
+        keyboard = CARD_KEYBOARD
+        if self.card_art is not None:
+            message = await self.card_art.send(
+                self.bot,
+                user_id,
+                card.name,
+                reply_markup=keyboard
+            )
+        else:
+            message = await self.bot.sendMessage(
+                user_id,
+                card.name,
+                reply_markup=keyboard
+            )
         message_id = message['message_id']
-        self.dealt_cards[user_id][message_id] = card
+        self.sessions.add_card(user_id, message_id, card)
 
     async def foreign_aid(self, message, _):
         '''
@@ -191,12 +392,11 @@ class CoupBot:
             message: a dict containing message data
         '''
         player_id = message['from']['id']
-        game = self.player_to_game[player_id]
+        game = self.sessions.user_games[player_id]
 
         try:
             cards = game.foreign_aid(player_id)
-            for card in cards:
-                await self.deal_card(player_id, card)
+            await self.deal_cards(player_id, cards)
         except ForeignAidNotFinished:
             await self.bot.sendMessage(
                 player_id,
@@ -208,22 +408,7 @@ class CoupBot:
         Sends a list of the possible actions
         '''
         chat_id = message['chat']['id']
-        actions = dedent('''\
-            *Influences and its actions*
-            *All* - Get 1 coin. Get 2 coins. Spend 7 coins to give
-            a coup d'etat (kill a influence of a player of your choice).
-            With 10 or more coins, coup d'etat is mandatory.
-            *Duke* - Get 3 coins. Blocks a player of getting 2
-            coins.
-            *Captain* - Steals 2 coins of another player. Blocks
-            ther captains
-            *Embassador* - Asks for foreign aid, buy the number of
-            influeces you possess, eliminates them until you have the number
-            of you had before. Blocks captains.
-            *Assassin* - Kills a influence of a player of your
-            choice for 3 coins.
-            *Duchess* - Blocks assassins.
-        ''')
+        actions = ACTIONS_TEXT
 
         await self.bot.sendMessage(
             chat_id,
@@ -231,81 +416,86 @@ class CoupBot:
             parse_mode='Markdown'
         )
 
-    async def hide(self, message, _):
+    async def hide(self, message, args):
         '''
         Edit message to hide a card from the player
 
         Args:
             message: a dict containing message data
+            args: Code of the card, when the whole hand is a single message
         '''
         chat_id = message['message']['chat']['id']
         message_id = message['message']['message_id']
 
-        if chat_id not in self.player_to_game:
+        if chat_id not in self.sessions.user_games:
             return await self.bot.sendMessage(
                 chat_id,
                 'You are not in a game',
                 message_id
             )
 
-        game = self.player_to_game[chat_id]
-        card = self.dealt_cards[chat_id][message_id]
+        game = self.sessions.user_games[chat_id]
+        card = self.pressed_card(chat_id, message_id, args)
         game.hide_card(chat_id, card)
+        if self.from_hand(chat_id, message_id):
+            return await self.send_hand(chat_id)
 
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text='Show',
-                callback_data='/show'
-            ),
-             InlineKeyboardButton(
-                 text='Remove',
-                 callback_data='/delete'
-            )],
-        ])
+        keyboard = HIDDEN_CARD_KEYBOARD
 
-        await self.bot.editMessageText(
-            msg_identifier=(chat_id, message_id),
-            text='?',
-            reply_markup=keyboard
-        )
+        if self.card_art is not None:
+            await self.card_art.edit(
+                self.bot,
+                (chat_id, message_id),
+                BACK,
+                reply_markup=keyboard
+            )
+        else:
+            await self.bot.editMessageText(
+                msg_identifier=(chat_id, message_id),
+                text='?',
+                reply_markup=keyboard
+            )
 
-    async def show(self, message, _):
+    async def show(self, message, args):
         '''
         Edit message to show a hidden card
 
         Args:
             message: a dict containing message data
+            args: Code of the card, when the whole hand is a single message
         '''
         chat_id = message['message']['chat']['id']
         message_id = message['message']['message_id']
-        if chat_id not in self.player_to_game:
+        if chat_id not in self.sessions.user_games:
             return await self.bot.sendMessage(
                 chat_id,
                 'You are not in a game',
                 message_id
             )
 
-        game = self.player_to_game[chat_id]
-        card = self.dealt_cards[chat_id][message_id]
+        game = self.sessions.user_games[chat_id]
+        card = self.pressed_card(chat_id, message_id, args)
         game.show_card(chat_id, card)
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text='Hide',
-                callback_data='/hide'
-            ),
-             InlineKeyboardButton(
-                 text='Remove',
-                 callback_data='/delete'
-            )],
-        ])
+        if self.from_hand(chat_id, message_id):
+            return await self.send_hand(chat_id)
 
-        await self.bot.editMessageText(
-            msg_identifier=(chat_id, message_id),
-            text=card.name,
-            reply_markup=keyboard
-        )
+        keyboard = CARD_KEYBOARD
 
-    async def delete(self, message, _):
+        if self.card_art is not None:
+            await self.card_art.edit(
+                self.bot,
+                (chat_id, message_id),
+                card.name,
+                reply_markup=keyboard
+            )
+        else:
+            await self.bot.editMessageText(
+                msg_identifier=(chat_id, message_id),
+                text=card.name,
+                reply_markup=keyboard
+            )
+
+    async def delete(self, message, args):
         '''
         Deletes a card from the player's hand. Remvoes player from game
         if it has no cards left, and finishes the game if there's only
@@ -313,18 +503,21 @@ class CoupBot:
 
         Args:
             message: a dict containing message data
+            args: Code of the card, when the whole hand is a single message
         '''
         message_id = message['message']['message_id']
         chat_id = message['message']['chat']['id']
         player_name = message['message']['chat']['first_name']
 
-        game = self.player_to_game[chat_id]
-        card = self.dealt_cards[chat_id][message_id]
+        game = self.sessions.user_games[chat_id]
+        from_hand = self.from_hand(chat_id, message_id)
+        card = self.pressed_card(chat_id, message_id, args)
         was_hidden = game.is_hidden(chat_id, card)
         player_removed = game.remove_card(chat_id, card)
 
-        del self.dealt_cards[chat_id][message_id]
-        await self.bot.deleteMessage((chat_id, message_id))
+        if not from_hand:
+            self.sessions.remove_card(chat_id, message_id)
+            await self.bot.deleteMessage((chat_id, message_id))
         message = f'A card from {player_name} was deleted.'
         await self.bot.sendMessage(game.group_id, message)
 
@@ -336,6 +529,9 @@ class CoupBot:
         elif not was_hidden:
             await self.deal_random_card(chat_id)
 
+        elif from_hand:
+            await self.send_hand(chat_id)
+
     async def remove_player(self, user_id: int):
         '''
         Removes a player from the game
@@ -343,13 +539,11 @@ class CoupBot:
         Args:
             user_id: Id of the user to be removed
         '''
-        for message_id in self.dealt_cards[user_id].keys():
+        game = self.sessions.user_games[user_id]
+        if user_id in game.player_ids():
+            game.remove_player(user_id)
+        for message_id in self.sessions.remove_user(user_id):
             await self.bot.deleteMessage((user_id, message_id))
-        del self.dealt_cards[user_id]
-
-        game = self.player_to_game[user_id]
-        game.remove_player(user_id)
-        del self.player_to_game[user_id]
 
     async def quit_game(self, message: Dict[str, Any], _):
         '''
@@ -361,13 +555,13 @@ class CoupBot:
         chat_id = message['chat']['id']
         user_id = message['from']['id']
 
-        if user_id not in self.player_to_game:
+        if user_id not in self.sessions.user_games:
             return await self.bot.sendMessage(
                 chat_id,
                 'You are not in a game'
             )
 
-        game = self.player_to_game[user_id]
+        game = self.sessions.user_games[user_id]
         await self.remove_player(user_id)
         if game.ended():
             await self.end_game(game)
@@ -381,19 +575,28 @@ class CoupBot:
         '''
         group_id = game.group_id
         reply = 'Game over.'
-        if len(game.players) == 1:
-            winner = next(iter(game.players.values()))
+        winner = None
+        player_ids = game.player_ids()
+        if len(player_ids) == 1:
+            winner = game.player(player_ids[0])
             reply += f' {winner.name} is the winner!'
 
-        for player in list(game.players.values()):
-            await self.remove_player(player.id)
+        messages = self.sessions.remove_game(group_id)
+        for user_id, message_id in messages:
+            await self.bot.deleteMessage((user_id, message_id))
 
-        del self.games[game.group_id]
         await self.bot.sendMessage(
             group_id,
             reply,
         )
 
+        if self.history is not None and game.started:
+            self.spawn(self.history.record(
+                group_id,
+                game.participants,
+                winner.id if winner is not None else None,
+            ))
+
     async def force_endgame(self, message, _):
         '''
         Force the end of the current game
@@ -403,13 +606,13 @@ class CoupBot:
         '''
         chat_id = message['chat']['id']
 
-        if chat_id not in self.games:
+        if chat_id not in self.sessions.games:
             return await self.bot.sendMessage(
                 chat_id,
                 'Game not started here',
             )
 
-        game = self.games[chat_id]
+        game = self.sessions.game(chat_id)
         await self.end_game(game)
 
     async def status(self, message, _):
@@ -423,10 +626,10 @@ class CoupBot:
         chat_id = message['chat']['id']
         message_id = message['message_id']
 
-        if player_id not in self.player_to_game:
+        if player_id not in self.sessions.user_games:
             reply = 'You\'re not in a game.'
         else:
-            game = self.player_to_game[player_id]
+            game = self.sessions.user_games[player_id]
             reply = game.status()
 
         await self.bot.sendMessage(
@@ -435,6 +638,34 @@ class CoupBot:
             reply_to_message_id=message_id
         )
 
+    async def stats(self, message, _):
+        '''
+        Sends how many games were played in the group, and how many
+        games the user played and won
+
+        Args:
+            message: a dict containing message data
+        '''
+        chat_id = message['chat']['id']
+        message_id = message['message_id']
+        user_id = message['from']['id']
+
+        if self.history is None:
+            reply = 'Stats are not being recorded.'
+        else:
+            group_games, user_games, user_wins = await self.history.stats(
+                chat_id, user_id
+            )
+            reply = f'You won {user_wins} of {user_games} games.'
+            if message['chat']['type'] in ('group', 'supergroup'):
+                reply += f'\n{group_games} games were played here.'
+
+        await self.bot.sendMessage(
+            chat_id,
+            reply,
+            reply_to_message_id=message_id
+        )
+
     async def help(self, message, _):
         '''
         Send a message with bot's actions
@@ -445,16 +676,7 @@ class CoupBot:
         chat_id = message['chat']['id']
         message_id = message['message_id']
 
-        reply = dedent('''\
-            */new_game* - Prepare to start a new game.
-            */join* - User joins the game if that match
-            hasn't started.
-            */start* - Start a game in a group.
-            */force_endgame* - Forces the end of the game in a group.
-            */rules* - Send a message with the game's rules.
-            */status* - Send to the group the current state of the
-            game.
-        ''')
+        reply = HELP_TEXT
 
         await self.bot.sendMessage(
             chat_id, reply,
@@ -472,29 +694,7 @@ class CoupBot:
         chat_id = message['chat']['id']
         message_id = message['message_id']
 
-        reply = dedent('''\
-            Each player is a member of the french court and possess
-            two influences. Each player playes once per round, on its
-            turn the player performs an action, which actions each influence
-            can perform will be explained at the beginning of the game.
-            When an action from a specific influence is performed, the player
-            must declare "I'm X and I'll do Y", other players com accept or
-            contest, claiming the player doesn't have it influence it claims
-            to have. If the player was really bluffing, it hides its
-            influences and let the contestant player choose a card to delete,
-            otherwise the player shows that it really had that influence and
-            it's the contestant player that hide it's cards and allow a card
-            to be deleted.
-            When a player is a victm of the assassin or a coup d'etat,
-            it must hide it's cards and allow the attacker to choose one to
-            remove.
-            In order to keep the social aspect of the game, this bot
-            doesn't implement coins. This is no obstacle, literally anything
-            can represent coins, from cutted paper to the christmas socks
-            your aunt Barbara gave to you and you never unpacked.
-            Wins the game the last player with at least one influence
-            remaining.
-        ''')
+        reply = RULES_TEXT
 
         await self.bot.sendMessage(
             chat_id,
@@ -502,6 +702,81 @@ class CoupBot:
             reply_to_message_id=message_id
         )
 
+    async def profile(self, message, args):
+        '''
+        Profile the handlers for some seconds. Only admins can use it
+
+        Args:
+            message: a dict containing message data
+            args: For how many seconds to profile, defaults to 30
+        '''
+        chat_id = message['chat']['id']
+        user_id = message['from']['id']
+
+        if user_id not in self.admins or self.profiler is None:
+            return None
+
+        try:
+            seconds = float(args) if args else 30.0
+        except ValueError:
+            seconds = 0.0
+
+        if seconds <= 0:
+            reply = 'Usage: /profile [seconds]'
+        elif self.profiler.running():
+            reply = 'Already profiling.'
+        else:
+            self.profiler.start()
+            asyncio.get_event_loop().create_task(
+                self.report_profile(self.profiler, chat_id, seconds)
+            )
+            reply = f'Profiling for {seconds:g} seconds.'
+
+        await self.bot.sendMessage(chat_id, reply)
+
+    async def report_profile(
+            self,
+            profiler: Profiler,
+            chat_id: int,
+            seconds: float,
+    ):
+        '''
+        Stop profiling after some seconds and tell where the profiles
+        were dumped
+
+        Args:
+            profiler: Profiler that was started
+            chat_id: Id of the chat where profiling was asked
+            seconds: For how many seconds to profile
+        '''
+        await asyncio.sleep(seconds)
+        try:
+            paths = await profiler.stop()
+        except OSError as error:
+            reply = f'Profiles could not be dumped: {error}'
+        else:
+            if paths is None:
+                return None
+            reply = f'Profiles dumped to {paths[0]} and {paths[1]}'
+
+        await self.bot.sendMessage(chat_id, reply)
+
+    async def metrics(self, message, _):
+        '''
+        Send the bot's metrics. Only admins can use it
+
+        Args:
+            message: a dict containing message data
+        '''
+        chat_id = message['chat']['id']
+        user_id = message['from']['id']
+
+        if user_id not in self.admins:
+            return None
+
+        reply = METRICS.report() or 'Nothing measured yet.'
+        await self.bot.sendMessage(chat_id, reply)
+
     def default(self, _, __):
         '''
         Default action. It gets called when the bot
@@ -515,10 +790,11 @@ class CoupBot:
         Args:
             message: a dict containing message data
         '''
-        if 'text' in message:
-            match = COMMAND_RE.search(message['text'].strip())
-        else:
-            match = COMMAND_RE.search(message['data'].strip())
+        text = message.get('text', message.get('data'))
+        if text is None:
+            return 'default', ([],)
+
+        match = COMMAND_RE.search(text.strip())
 
         if match:
             command, recipient, args = match.groups()
@@ -527,9 +803,7 @@ class CoupBot:
 
             return command, (args,)
 
-        if message['text'] == 'Foreign aid':
-            return 'foreign_aid', ([],)
-        if message['text'] == 'Quit game':
-            return 'quit_game', ([],)
+        if text in KEYBOARD_COMMANDS:
+            return KEYBOARD_COMMANDS[text], ([],)
 
         return 'default', ([],)
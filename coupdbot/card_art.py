@@ -0,0 +1,177 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from telepot import _rectify
+from telepot.exception import TelegramError
+
+
+BACK = 'back'
+
+# Descriptions Telegram gives to errors caused by an unknown or malformed
+# file_id, as in "Bad Request: wrong file identifier/HTTP URL specified"
+INVALID_FILE_ERRORS = ('wrong file identifier', 'wrong remote file identifier')
+
+
+def invalid_file(error: TelegramError):
+    '''
+    Check if an error was caused by an unusable file_id
+
+    Args:
+        error: Error returned by Telegram
+    Returns:
+        Wheter the file_id must be uploaded again
+    '''
+    description = str(error.description).lower()
+    return error.error_code == 400 and any(
+        message in description for message in INVALID_FILE_ERRORS
+    )
+
+
+@dataclass
+class CardArt:
+    '''
+    The CardArt sends cards as photos. Each image is uploaded only once,
+    later messages reuse the file_id Telegram returned for it, which is
+    saved to cache_file so it survives restarts
+
+    Args:
+        directory: Directory with a <name>.png image for each Card, and
+        a back.png image shown for hidden cards
+
+    Attributes:
+        directory: Directory with the card images
+        cache_file: JSON file where file_ids are saved, if anywhere
+        file_ids: Map from image name to its file_id
+    '''
+    directory: str
+    cache_file: Optional[str] = None
+    file_ids: Dict[str, str] = field(default_factory=lambda: {})
+
+    def __post_init__(self):
+        if self.cache_file is not None and os.path.exists(self.cache_file):
+            with open(self.cache_file) as cache:
+                self.file_ids = json.load(cache)
+
+    def path(self, name: str):
+        '''
+        Get the path of an image
+
+        Args:
+            name: Name of the image, a Card name or BACK
+        Returns:
+            Path of the image file
+        '''
+        return os.path.join(self.directory, f'{name.lower()}.png')
+
+    def remember(self, name: str, message: Dict[str, Any]):
+        '''
+        Save the file_id of an uploaded image
+
+        Args:
+            name: Name of the image
+            message: Message holding the uploaded image
+        '''
+        self.file_ids[name] = message['photo'][-1]['file_id']
+        if self.cache_file is None:
+            return
+
+        temporary = f'{self.cache_file}.tmp'
+        with open(temporary, 'w') as cache:
+            json.dump(self.file_ids, cache)
+        os.replace(temporary, self.cache_file)
+
+    async def send(self, bot, chat_id: int, name: str, **kwargs):
+        '''
+        Send an image, uploading it if it has no usable file_id
+
+        Args:
+            bot: Bot handler
+            chat_id: Id of the chat to send the image to
+            name: Name of the image, a Card name or BACK
+            kwargs: Extra arguments to sendPhoto
+        Returns:
+            The sent message
+        '''
+        file_id = self.file_ids.get(name)
+        if file_id is not None:
+            try:
+                return await bot.sendPhoto(chat_id, file_id, **kwargs)
+            except TelegramError as error:
+                if not invalid_file(error):
+                    raise
+                del self.file_ids[name]
+
+        with open(self.path(name), 'rb') as image:
+            message = await bot.sendPhoto(chat_id, image, **kwargs)
+        self.remember(name, message)
+        return message
+
+    async def edit(
+            self,
+            bot,
+            msg_identifier: Tuple[int, int],
+            name: str,
+            reply_markup=None,
+    ):
+        '''
+        Replace the image of a message, uploading it if it has no usable
+        file_id
+
+        Args:
+            bot: Bot handler
+            msg_identifier: Chat id and message id of the message
+            name: Name of the image, a Card name or BACK
+            reply_markup: New keyboard of the message
+        Returns:
+            The edited message
+        '''
+        file_id = self.file_ids.get(name)
+        if file_id is not None:
+            try:
+                return await edit_media(
+                    bot, msg_identifier, file_id, reply_markup=reply_markup
+                )
+            except TelegramError as error:
+                if not invalid_file(error):
+                    raise
+                del self.file_ids[name]
+
+        with open(self.path(name), 'rb') as image:
+            message = await edit_media(
+                bot, msg_identifier, image, reply_markup=reply_markup
+            )
+        self.remember(name, message)
+        return message
+
+
+async def edit_media(bot, msg_identifier: Tuple[int, int], photo,
+                     reply_markup=None):
+    '''
+    Call editMessageMedia, which telepot's Bot doesn't implement
+
+    Args:
+        bot: Bot handler
+        msg_identifier: Chat id and message id of the message
+        photo: file_id of the new photo, or a file to upload
+        reply_markup: New keyboard of the message
+    Returns:
+        The edited message
+    '''
+    chat_id, message_id = msg_identifier
+    params = {
+        'chat_id': chat_id,
+        'message_id': message_id,
+        'reply_markup': reply_markup,
+    }
+    if isinstance(photo, str):
+        params['media'] = {'type': 'photo', 'media': photo}
+        return await bot._api_request(  # pylint: disable=protected-access
+            'editMessageMedia', _rectify(params)
+        )
+
+    params['media'] = {'type': 'photo', 'media': 'attach://photo'}
+    return await bot._api_request(  # pylint: disable=protected-access
+        'editMessageMedia', _rectify(params), {'photo': photo}
+    )
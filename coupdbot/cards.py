@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import IntEnum
 
 
-Card = Enum('Card', 'Duke Captain Embassador Assassin Duchess')
+Card = IntEnum('Card', 'Duke Captain Embassador Assassin Duchess')
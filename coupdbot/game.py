@@ -1,10 +1,12 @@
 from dataclasses import dataclass, field
 from random import shuffle
-from typing import Dict, List
+from typing import Any, Tuple
 
 from .errors import ForeignAidNotFinished, GameAlreadyStarted, PlayerNotInGame
 from .cards import Card
 from .player import Player
+from .tracing import traced
+from .utils import slotted
 
 
 N_CARDS = {
@@ -21,26 +23,158 @@ N_CARDS = {
 }
 
 
+# How many values each player takes in Game.roster: its id, its name
+# and its packed hand
+PLAYER_FIELDS = 3
+
+# Bit set on the value of a hidden card in a packed hand
+HIDDEN = 0x80
+
+
+def pack(player: Player):
+    '''
+    Pack the cards of a player into bytes. Each card takes a byte with
+    its value, with HIDDEN set if it's hidden, followed by a zero byte
+    for each card coming from foreign aid
+
+    Args:
+        player: Player whose cards are packed
+    Returns:
+        The packed hand
+    '''
+    return (
+        bytes(player.cards)
+        + bytes(card | HIDDEN for card in player.hidden_cards)
+        + bytes(player.foreign_aid_cards)
+    )
+
+
+def unpack(player_id: int, name: str, hand: bytes):
+    '''
+    Build a player from a roster row
+
+    Args:
+        player_id: Id of the player
+        name: Name of the player
+        hand: Cards of the player, as made by pack
+    Returns:
+        The Player object
+    '''
+    return Player(
+        player_id,
+        name,
+        tuple(Card(value) for value in hand if value and not value & HIDDEN),
+        tuple(Card(value & ~HIDDEN) for value in hand if value & HIDDEN),
+        hand.count(0),
+    )
+
+
+@slotted
 @dataclass
 class Game:
     '''
     Class Game handles game's actions
 
+    Players are stored as rows of a flat roster instead of an object
+    and a dict entry each. Player objects are built from these rows
+    when read and packed back when changed
+
     Args:
         group_id: Id where this game is running
 
     Attributes:
         group_id: Id where this game is running
-        players: Map from the id of a player in the game for its
-        Player object
-        deck: Deck of available cards
+        roster: Fields of every player in the game, PLAYER_FIELDS
+        values per player
+        deck: Deck of available cards, stored as card values. It's
+        empty until the game starts
         started: Wheter tha game has already started or not
+        participants: Ids of every player in the game when it started
     '''
     group_id: int
-    players: Dict[int, Player] = field(default_factory=lambda: {})
-    deck: List[Card] = field(default_factory=lambda: [])
+    roster: Tuple[Any, ...] = ()
+    deck: bytearray = field(default_factory=bytearray)
     started: bool = False
+    participants: Tuple[int, ...] = ()
+
+    @property
+    def players(self):
+        '''
+        Map from the id of a player in the game to its Player object.
+        Every row is unpacked on each access, so player_ids and player
+        are cheaper when only some players are needed. The Player
+        objects are copies: callers must not mutate them, as changes
+        aren't stored in the game
+        '''
+        return {
+            self.roster[index]: unpack(*self.roster[index:index + PLAYER_FIELDS])
+            for index in range(0, len(self.roster), PLAYER_FIELDS)
+        }
+
+    def player_ids(self):
+        '''
+        Get the ids of the players in the game
 
+        Returns:
+            A tuple with the ids, in the order players joined
+        '''
+        return self.roster[::PLAYER_FIELDS]
+
+    def row(self, player_id: int):
+        '''
+        Find where a player is stored in the roster
+
+        Args:
+            player_id: Id of the player
+        Returns:
+            Index of the first value of the player in the roster
+        '''
+        for index in range(0, len(self.roster), PLAYER_FIELDS):
+            if self.roster[index] == player_id:
+                return index
+        raise PlayerNotInGame
+
+    def player(self, player_id: int):
+        '''
+        Read a player from the roster
+
+        Args:
+            player_id: Id of the player
+        Returns:
+            The Player object
+        '''
+        index = self.row(player_id)
+        return unpack(*self.roster[index:index + PLAYER_FIELDS])
+
+    def store(self, player: Player):
+        '''
+        Write a player to the roster, adding it if it isn't there
+
+        Args:
+            player: Player to be written
+        '''
+        try:
+            index = self.row(player.id)
+        except PlayerNotInGame:
+            index = len(self.roster)
+
+        self.roster = (
+            self.roster[:index]
+            + (player.id, player.name, pack(player))
+            + self.roster[index + PLAYER_FIELDS:]
+        )
+
+    def drop(self, player_id: int):
+        '''
+        Remove a player from the roster
+
+        Args:
+            player_id: Id of the player to be removed
+        '''
+        index = self.row(player_id)
+        self.roster = self.roster[:index] + self.roster[index + PLAYER_FIELDS:]
+
+    @traced('game.start')
     def start(self):
         '''
         Starts the game.
@@ -50,7 +184,9 @@ class Game:
 
         self.create_deck()
         self.started = True
+        self.participants = self.player_ids()
 
+    @traced('game.add_player')
     def add_player(self, player_id: int, player_name: str):
         '''
         Add a new player to the game
@@ -62,9 +198,9 @@ class Game:
         if self.started:
             raise GameAlreadyStarted
 
-        player = Player(player_id, player_name)
-        self.players[player_id] = player
+        self.store(Player(player_id, player_name))
 
+    @traced('game.deal_card')
     def deal_card(self, user_id: int, foreign_aid: bool = False):
         '''
         Deals a card to a player
@@ -75,10 +211,13 @@ class Game:
         Returns:
             The type of the dealed card
         '''
-        card = self.deck.pop()
-        self.players[user_id].add_card(card, foreign_aid)
+        player = self.player(user_id)
+        card = Card(self.deck.pop())
+        player.add_card(card, foreign_aid)
+        self.store(player)
         return card
 
+    @traced('game.hide_card')
     def hide_card(self, player_id: int, card: Card):
         '''
         Move a card to the player's hidden hand
@@ -87,12 +226,11 @@ class Game:
             player_id: Id of the player to move the card from
             card: Card that will be move
         '''
-        if player_id not in self.players:
-            raise PlayerNotInGame
-
-        player = self.players[player_id]
+        player = self.player(player_id)
         player.hide_card(card)
+        self.store(player)
 
+    @traced('game.show_card')
     def show_card(self, player_id: int, card: Card):
         '''
         Move a card to the player's open hand
@@ -101,11 +239,9 @@ class Game:
             player_id: Id of the player to move the card from
             card: Card that will be move
         '''
-        if player_id not in self.players:
-            raise PlayerNotInGame
-
-        player = self.players[player_id]
+        player = self.player(player_id)
         player.show_card(card)
+        self.store(player)
 
     def is_hidden(self, player_id: int, card: Card):
         '''
@@ -117,12 +253,9 @@ class Game:
         Returns:
             Wheter the card is hidden or not
         '''
-        if player_id not in self.players:
-            raise PlayerNotInGame
-
-        player = self.players[player_id]
-        return player.is_hidden(card)
+        return self.player(player_id).is_hidden(card)
 
+    @traced('game.remove_card')
     def remove_card(self, player_id: int, card: Card):
         '''
         Remove a card from the player's hand. It also removes player
@@ -134,19 +267,19 @@ class Game:
         Returns:
             Wheter the player was removed from the game
         '''
-        if player_id not in self.players:
-            raise PlayerNotInGame
-
-        player = self.players[player_id]
+        player = self.player(player_id)
         player.remove_card(card)
         self.deck.append(card)
         shuffle(self.deck)
 
         if player.hand_size() == 0:
-            del self.players[player.id]
+            self.drop(player_id)
             return True
+
+        self.store(player)
         return False
 
+    @traced('game.foreign_aid')
     def foreign_aid(self, player_id: int):
         '''
         Gives random cards to a player until it has
@@ -157,10 +290,7 @@ class Game:
         Returns:
             List of cards given to the player
         '''
-        if player_id not in self.players:
-            raise PlayerNotInGame
-
-        player = self.players[player_id]
+        player = self.player(player_id)
         if player.foreign_aid_cards != 0:
             raise ForeignAidNotFinished
 
@@ -168,6 +298,7 @@ class Game:
             self.deal_card(player_id, True) for _ in range(player.hand_size())
         ]
 
+    @traced('game.remove_player')
     def remove_player(self, player_id: int):
         '''
         Removes player from the game
@@ -175,12 +306,11 @@ class Game:
         Args:
             player_id: Id of the player to be removed
         '''
-        player = self.players[player_id]
-        for card in player.hand():
-            player.remove_card(card)
-            self.deck.append(card)
-        shuffle(self.deck)
-        del self.players[player_id]
+        player = self.player(player_id)
+        if player.hand_size() != 0:
+            self.deck.extend(player.hand())
+            shuffle(self.deck)
+        self.drop(player_id)
 
     def ended(self):
         '''
@@ -189,21 +319,18 @@ class Game:
         Returns:
             Wheter the game has ended or not
         '''
-        return len(self.players) <= 1
+        return len(self.roster) <= PLAYER_FIELDS
 
     def create_deck(self):
         '''
         Create the starting deck to play the game
         '''
-        n_players = len(self.players)
+        n_players = len(self.roster) // PLAYER_FIELDS
         n_cards = N_CARDS[n_players]
         n_influences = len(Card)
         n_each_influence = n_cards // n_influences
 
-        for _ in range(n_each_influence):
-            for influence in Card:
-                card = influence
-                self.deck.append(card)
+        self.deck = bytearray(bytes(Card) * n_each_influence)
 
         shuffle(self.deck)
 
@@ -0,0 +1,145 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL,
+    ended_at REAL NOT NULL,
+    winner_id INTEGER,
+    player_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS group_stats (
+    group_id INTEGER PRIMARY KEY,
+    games INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL
+);
+'''
+
+
+@dataclass
+class History:
+    '''
+    The History stores finished games in a SQLite file. Along with each
+    game, the games played in its group and the games played and won
+    by each of its players are updated, so stats never scan the games.
+    Queries run in a single worker thread to keep the event loop free
+
+    Args:
+        path: Path of the SQLite file
+
+    Attributes:
+        path: Path of the SQLite file
+        connection: Connection to the SQLite file
+        executor: Thread where the queries run
+    '''
+    path: str
+    connection: sqlite3.Connection = field(init=False)
+    executor: ThreadPoolExecutor = field(
+        default_factory=lambda: ThreadPoolExecutor(max_workers=1)
+    )
+
+    def __post_init__(self):
+        self.connection = sqlite3.connect(
+            self.path, check_same_thread=False
+        )
+        self.connection.executescript(SCHEMA)
+
+    def record(
+            self,
+            group_id: int,
+            player_ids: Sequence[int],
+            winner_id: Optional[int],
+    ) -> asyncio.Future:
+        '''
+        Store a finished game and update the stats. The write is queued
+        right away, so stats asked for afterwards already count it
+
+        Args:
+            group_id: Id of the group where the game was played
+            player_ids: Ids of every player that joined the game
+            winner_id: Id of the winner, None if there's no winner
+        Returns:
+            Future done once the game is stored
+        '''
+        return asyncio.get_event_loop().run_in_executor(
+            self.executor, self.write, group_id, player_ids, winner_id
+        )
+
+    def write(
+            self,
+            group_id: int,
+            player_ids: Sequence[int],
+            winner_id: Optional[int],
+    ):
+        '''
+        Store a finished game and update the stats, blocking until done
+
+        Args:
+            group_id: Id of the group where the game was played
+            player_ids: Ids of every player that joined the game
+            winner_id: Id of the winner, None if there's no winner
+        '''
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO games (group_id, ended_at, winner_id, player_ids)'
+                ' VALUES (?, ?, ?, ?)',
+                (group_id, time.time(), winner_id,
+                 ','.join(str(x) for x in player_ids)),
+            )
+            self.connection.execute(
+                'INSERT INTO group_stats VALUES (?, 1) ON CONFLICT (group_id)'
+                ' DO UPDATE SET games = games + 1',
+                (group_id,),
+            )
+            self.connection.executemany(
+                'INSERT INTO user_stats VALUES (?, 1, ?) ON CONFLICT (user_id)'
+                ' DO UPDATE SET games = games + 1, wins = wins + excluded.wins',
+                [(x, int(x == winner_id)) for x in player_ids],
+            )
+
+    async def stats(self, group_id: int, user_id: int):
+        '''
+        Get the stats of a group and a user
+
+        Args:
+            group_id: Id of the group
+            user_id: Id of the user
+        Returns:
+            Games played in the group, games played by the user and
+            games won by the user
+        '''
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, self.read, group_id, user_id
+        )
+
+    def read(self, group_id: int, user_id: int):
+        '''
+        Get the stats of a group and a user, blocking until done
+
+        Args:
+            group_id: Id of the group
+            user_id: Id of the user
+        Returns:
+            Games played in the group, games played by the user and
+            games won by the user
+        '''
+        group = self.connection.execute(
+            'SELECT games FROM group_stats WHERE group_id = ?', (group_id,)
+        ).fetchone()
+        user = self.connection.execute(
+            'SELECT games, wins FROM user_stats WHERE user_id = ?', (user_id,)
+        ).fetchone()
+
+        group_games = group[0] if group else 0
+        user_games, user_wins = user if user else (0, 0)
+        return group_games, user_games, user_wins
@@ -0,0 +1,30 @@
+from typing import Any, Dict, Optional
+
+
+KEYBOARD_COMMANDS = {
+    'Foreign aid': 'foreign_aid',
+    'Quit game': 'quit_game',
+}
+
+
+def drop_reason(message: Dict[str, Any]) -> Optional[str]:
+    '''
+    Cheaply check if a message can't be handled by any command, so it
+    can be dropped before being routed
+
+    Args:
+        message: a dict containing message data
+    Returns:
+        Why the message should be dropped, or None if it may be a
+        command, a callback or a reply keyboard press
+    '''
+    if 'data' in message:
+        return None
+
+    text = message.get('text')
+    if text is None:
+        return 'no_text'
+    if text in KEYBOARD_COMMANDS or text.lstrip().startswith('/'):
+        return None
+
+    return 'not_command'
@@ -0,0 +1,67 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Tuple
+
+
+@dataclass
+class Metrics:
+    '''
+    The Metrics count events happening in the bot
+
+    Attributes:
+        counters: Map from a metric name and its labels to how many
+        times it happened
+    '''
+    counters: Counter = field(default_factory=Counter)
+
+    def inc(self, name: str, *labels: str):
+        '''
+        Count an event
+
+        Args:
+            name: Name of the metric
+            labels: Labels further identifying the event
+        '''
+        self.counters[(name,) + labels] += 1
+
+    def get(self, name: str, *labels: str):
+        '''
+        Get how many times an event happened
+
+        Args:
+            name: Name of the metric
+            labels: Labels further identifying the event
+        Returns:
+            How many times the event happened
+        '''
+        return self.counters[(name,) + labels]
+
+    def report(self):
+        '''
+        Get every counter in a readable format
+
+        Returns:
+            String with a counter per line
+        '''
+        lines = []
+        for key, value in sorted(self.counters.items()):
+            lines.append(f'{format_key(key)} {value}')
+        return '\n'.join(lines)
+
+
+def format_key(key: Tuple[str, ...]):
+    '''
+    Format a counter key as name{label,...}
+
+    Args:
+        key: Metric name followed by its labels
+    Returns:
+        The formatted key
+    '''
+    name, *labels = key
+    if not labels:
+        return name
+    return f'{name}{{{",".join(labels)}}}'
+
+
+METRICS = Metrics()
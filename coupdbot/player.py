@@ -1,14 +1,31 @@
-from dataclasses import dataclass, field
-from typing import List
+from dataclasses import dataclass
+from typing import Tuple
 
 from .cards import Card
 from .errors import CardNotFound
+from .utils import slotted
 
 
+def without(cards: Tuple[Card, ...], card: Card):
+    '''
+    Copy a hand without the first occurrence of a card
+
+    Args:
+        cards: Hand to copy from
+        card: Card to be left out
+    Returns:
+        The new hand
+    '''
+    index = cards.index(card)
+    return cards[:index] + cards[index+1:]
+
+
+@slotted
 @dataclass
 class Player:
     '''
-    Class Player handles player data
+    Class Player handles player data. Games don't keep Player objects,
+    they're built from Game.roster when a player is read
 
     Args:
         id: Player's id
@@ -16,15 +33,15 @@ class Player:
     Attributes:
         id: Player's id
         name: Player's name
-        cards: List with open cards held by the player
-        hidden_cards: List with hidden cards held by the player
+        cards: Tuple with open cards held by the player
+        hidden_cards: Tuple with hidden cards held by the player
         foreign_aid_cards: How many cards, either open or hidden,
         comes from foreign aid.
     '''
     id: int
     name: str
-    cards: List = field(default_factory=lambda: [])
-    hidden_cards: List = field(default_factory=lambda: [])
+    cards: Tuple[Card, ...] = ()
+    hidden_cards: Tuple[Card, ...] = ()
     foreign_aid_cards: int = 0
 
     def add_card(self, card: Card, foreign_aid: bool = False):
@@ -38,7 +55,7 @@ class Player:
         if foreign_aid:
             self.foreign_aid_cards += 1
 
-        self.cards.append(card)
+        self.cards += (card,)
 
     def hide_card(self, card: Card):
         '''
@@ -50,8 +67,8 @@ class Player:
         if card not in self.cards:
             raise CardNotFound
 
-        self.cards.remove(card)
-        self.hidden_cards.append(card)
+        self.cards = without(self.cards, card)
+        self.hidden_cards += (card,)
 
     def show_card(self, card: Card):
         '''
@@ -63,8 +80,8 @@ class Player:
         if card not in self.hidden_cards:
             raise CardNotFound
 
-        self.hidden_cards.remove(card)
-        self.cards.append(card)
+        self.hidden_cards = without(self.hidden_cards, card)
+        self.cards += (card,)
 
     def remove_card(self, card: Card):
         '''
@@ -76,10 +93,10 @@ class Player:
             card: Card to me removed
         '''
         if card in self.hidden_cards:
-            self.hidden_cards.remove(card)
+            self.hidden_cards = without(self.hidden_cards, card)
             self.foreign_aid_cards = max(0, self.foreign_aid_cards-1)
         elif card in self.cards:
-            self.cards.remove(card)
+            self.cards = without(self.cards, card)
             self.foreign_aid_cards = max(0, self.foreign_aid_cards-1)
         else:
             raise CardNotFound
@@ -89,7 +106,7 @@ class Player:
         Returns all cards in hand
 
         Returns:
-            A list with all cards the player holds
+            A tuple with all cards the player holds
         '''
         return self.cards + self.hidden_cards
 
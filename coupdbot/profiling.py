@@ -0,0 +1,150 @@
+import asyncio
+import cProfile
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class Profiler:
+    '''
+    The Profiler samples CPU and memory usage of the routed handlers
+    for a limited amount of time
+
+    While idle, the routing tables hold the original handlers, so
+    profiling adds no overhead until it's started.
+
+    cProfile and tracemalloc are global to the process, so a single
+    Profiler should be shared by every bot in it, each one adding its
+    routing table.
+
+    Args:
+        output_dir: Directory where the profiles will be dumped
+
+    Attributes:
+        output_dir: Directory where the profiles will be dumped
+        routing_tables: Maps from command to handler, as given to the
+        Routers
+        handlers: Original handlers of each routing table, stored while
+        profiling is running
+        cpu: CPU profiler of the current session
+        depth: How many profiled handlers are running right now
+    '''
+    output_dir: str = '.'
+    routing_tables: List[Dict[Any, Callable]] = field(
+        default_factory=lambda: []
+    )
+    handlers: List[Dict[Any, Callable]] = field(default_factory=lambda: [])
+    cpu: Optional[cProfile.Profile] = None
+    depth: int = 0
+
+    def add(self, routing_table: Dict[Any, Callable]):
+        '''
+        Profile the handlers of a routing table too
+
+        Args:
+            routing_table: Map from command to handler, as given to the
+            Router
+        '''
+        self.routing_tables.append(routing_table)
+        if self.running():
+            self.handlers.append(dict(routing_table))
+            self.wrap_all(routing_table)
+
+    def running(self):
+        '''
+        Check if there's a profiling session running
+
+        Returns:
+            Wheter the profiler is running or not
+        '''
+        return self.cpu is not None
+
+    def start(self):
+        '''
+        Start profiling the handlers, until stop is called
+        '''
+        if self.running():
+            return
+
+        self.cpu = cProfile.Profile()
+        tracemalloc.start()
+        self.handlers = [dict(table) for table in self.routing_tables]
+        for routing_table in self.routing_tables:
+            self.wrap_all(routing_table)
+
+    async def stop(self):
+        '''
+        Stop profiling, restore the original handlers and dump the
+        profiles to the output directory. The profilers are stopped even
+        if the profiles can't be written, and the files are written
+        outside the event loop
+
+        Returns:
+            Paths of the CPU and memory profiles, None if the profiler
+            wasn't running
+        '''
+        if not self.running():
+            return None
+
+        for routing_table, handlers in zip(self.routing_tables, self.handlers):
+            routing_table.update(handlers)
+        self.handlers = []
+        cpu, self.cpu = self.cpu, None
+        cpu.disable()
+        try:
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+
+        prefix = os.path.join(
+            self.output_dir,
+            time.strftime('coupdbot-%Y%m%d-%H%M%S') + f'-{os.getpid()}',
+        )
+        cpu_path = f'{prefix}.prof'
+        memory_path = f'{prefix}.snapshot'
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, cpu.dump_stats, cpu_path)
+        await loop.run_in_executor(None, snapshot.dump, memory_path)
+
+        return cpu_path, memory_path
+
+    def wrap_all(self, routing_table: Dict[Any, Callable]):
+        '''
+        Replace every handler of a routing table by its wrapped version
+
+        Args:
+            routing_table: Map from command to handler
+        '''
+        for key, handler in routing_table.items():
+            routing_table[key] = self.wrap(handler)
+
+    def wrap(self, handler: Callable):
+        '''
+        Wrap a handler so the CPU profiler is enabled while it runs
+
+        Args:
+            handler: Handler to be wrapped
+        Returns:
+            The wrapped handler
+        '''
+        @wraps(handler)
+        async def profiled(*args, **kwargs):
+            cpu = self.cpu
+            if cpu is not None and self.depth == 0:
+                cpu.enable()
+            self.depth += 1
+            try:
+                result = handler(*args, **kwargs)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                return result
+            finally:
+                self.depth -= 1
+                if cpu is not None and self.depth == 0 and self.cpu is cpu:
+                    cpu.disable()
+
+        return profiled
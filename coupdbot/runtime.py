@@ -0,0 +1,397 @@
+import asyncio
+import json
+import os
+import signal
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+import aiohttp
+import telepot.aio.api
+from telepot.exception import BadHTTPResponse
+from telepot.loop import _extract_message
+
+from . import state
+from .bot import CoupBot
+from .ingress import drop_reason
+from .metrics import METRICS
+
+
+# Updates asked to Telegram, the only ones that can hold a command
+ALLOWED_UPDATES = ['message', 'callback_query']
+
+
+def install_uvloop():
+    '''
+    Make asyncio use uvloop's event loop. It must be called before
+    the event loop is created
+    '''
+    import uvloop  # pylint: disable=import-outside-toplevel
+    uvloop.install()
+
+
+async def open_http_pool(connections: int = 10, bots: int = 1):
+    '''
+    Replace the HTTP session telepot's bots share by one made on the
+    running event loop. telepot.aio makes it when imported, on the
+    event loop existing then, so it fails on any other loop, e.g. after
+    installing uvloop. Each bot's getUpdates long poll holds a
+    connection of the session while it waits, so one more connection
+    is allowed per bot
+
+    Args:
+        connections: Most connections open at once for other requests
+        bots: How many bots share the session
+    '''
+    pools = telepot.aio.api._pools  # pylint: disable=protected-access
+    previous = pools['default']
+    pools['default'] = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=connections + bots)
+    )
+    await previous.close()
+
+
+async def close_http_pool():
+    '''
+    Close the HTTP session made by open_http_pool
+    '''
+    pools = telepot.aio.api._pools  # pylint: disable=protected-access
+    await pools['default'].close()
+
+
+@dataclass
+class Runtime:
+    '''
+    The Runtime reads updates and runs their handlers until it's asked
+    to stop. When stopping, it stops reading updates, waits for the
+    running handlers to finish and saves the bot state. A new process
+    can also take over the bot through handoff_socket, receiving the
+    bot state instead of it being saved
+
+    Args:
+        coup_bot: The CoupBot instance that will be executed
+        route: Function that handles a message, made by routes
+
+    Attributes:
+        coup_bot: The CoupBot instance that will be executed
+        route: Function that handles a message, made by routes
+        state_file: Where the bot state is saved, if anywhere
+        drain_timeout: How many seconds to wait for running handlers
+        when stopping
+        handoff_socket: Path of the unix socket a new process connects
+        to in order to take over the bot
+        offset: Id of the next update to be read
+        backlog: Updates read before the bot state was taken over, to be
+        handled once run is called. None when updates are handled as
+        soon as they're read
+        ingest: Task reading updates
+        server: Server listening on handoff_socket
+        closing: Wheter the runtime was asked to stop
+        tasks: Handler tasks that are still running
+        closed: Set once the runtime has stopped
+    '''
+    coup_bot: CoupBot
+    route: Callable
+    state_file: Optional[str] = None
+    drain_timeout: float = 10.0
+    handoff_socket: Optional[str] = None
+    offset: Optional[int] = None
+    backlog: Optional[List[Dict[str, Any]]] = None
+    ingest: Optional[asyncio.Task] = None
+    server: Optional[asyncio.AbstractServer] = None
+    closing: bool = False
+    tasks: Set[asyncio.Task] = field(default_factory=set)
+    closed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def restore(self):
+        '''
+        Load the bot state saved by a previous run, if there's one
+        '''
+        if self.state_file is None or not os.path.exists(self.state_file):
+            return
+
+        sessions, offset = state.read(self.state_file)
+        self.coup_bot.sessions = sessions
+        # Updates may already be read from the offset of a take over
+        if self.ingest is None:
+            self.offset = offset
+
+    def persist(self):
+        '''
+        Save the bot state, if there's a state file
+        '''
+        if self.state_file is None:
+            return
+
+        state.save(self.state_file, self.coup_bot.sessions, self.offset)
+
+    def on_update(self, update: Dict[str, Any]):
+        '''
+        Start handling an update, unless it can't be a command. While
+        there's a backlog, the update is added to it instead
+
+        Args:
+            update: a dict containing update data
+        '''
+        self.offset = update['update_id'] + 1
+        if self.backlog is not None:
+            self.backlog.append(update)
+            return
+        self.dispatch(update)
+
+    def dispatch(self, update: Dict[str, Any]):
+        '''
+        Start handling an update, unless it can't be a command
+
+        Args:
+            update: a dict containing update data
+        '''
+        try:
+            _, message = _extract_message(update)
+        except KeyError:
+            # Update types telepot doesn't know, like my_chat_member
+            METRICS.inc('ingress_dropped', 'not_message')
+            return
+        reason = drop_reason(message)
+        if reason is not None:
+            METRICS.inc('ingress_dropped', reason)
+            return
+
+        task = asyncio.get_event_loop().create_task(self.route(message))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run(self):
+        '''
+        Read and handle updates until the runtime is shut down, or until
+        a new process takes over
+        '''
+        loop = asyncio.get_event_loop()
+        if self.handoff_socket is not None:
+            if os.path.exists(self.handoff_socket):
+                os.unlink(self.handoff_socket)
+            self.server = await asyncio.start_unix_server(
+                self.hand_off, self.handoff_socket
+            )
+
+        backlog, self.backlog = self.backlog or [], None
+        for update in backlog:
+            self.dispatch(update)
+        if self.ingest is None:
+            self.ingest = loop.create_task(self.poll())
+        await self.closed.wait()
+
+    async def poll(self):
+        '''
+        Read updates until cancelled. telepot's GetUpdatesLoop isn't used
+        as it swallows asyncio's CancelledError and can't be stopped
+        '''
+        while True:
+            try:
+                updates = await self.coup_bot.bot.getUpdates(
+                    offset=self.offset,
+                    timeout=20,
+                    allowed_updates=ALLOWED_UPDATES,
+                )
+            except asyncio.CancelledError:
+                raise
+            except BadHTTPResponse as error:
+                traceback.print_exc()
+                # Servers probably down, wait longer
+                await asyncio.sleep(30 if error.status == 502 else 0.1)
+                continue
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+                await asyncio.sleep(0.1)
+                continue
+
+            for update in updates:
+                try:
+                    self.on_update(update)
+                except Exception:  # pylint: disable=broad-except
+                    traceback.print_exc()
+
+    def stop_reading(self):
+        '''
+        Stop reading updates and accepting new processes. Updates left
+        in the backlog are read again by the next process
+        '''
+        self.closing = True
+        if self.ingest is not None:
+            self.ingest.cancel()
+        if self.server is not None:
+            self.server.close()
+        if self.backlog:
+            self.offset = self.backlog[0]['update_id']
+        self.backlog = None
+
+    async def drain(self):
+        '''
+        Stop reading updates and wait for the running handlers
+
+        Handlers may leave tasks in the CoupBot's background, like
+        history writes, which are waited for too
+
+        Returns:
+            Tasks still running after drain_timeout
+        '''
+        self.stop_reading()
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.drain_timeout
+        pending = self.tasks | self.coup_bot.background
+        while pending and loop.time() < deadline:
+            await asyncio.wait(pending, timeout=deadline - loop.time())
+            pending = self.tasks | self.coup_bot.background
+        return pending
+
+    def close(self, pending: Set[asyncio.Task]):
+        '''
+        Cancel the handlers that didn't finish and let run return
+
+        Args:
+            pending: Tasks still running
+        '''
+        for task in pending:
+            task.cancel()
+        self.closed.set()
+
+    async def shutdown(self):
+        '''
+        Stop reading updates, wait for the running handlers, then save
+        the bot state. Handlers still running after drain_timeout are
+        cancelled
+        '''
+        if self.closing:
+            return
+
+        pending = await self.drain()
+        self.persist()
+        self.close(pending)
+
+    async def hand_off(self, _, writer: asyncio.StreamWriter):
+        '''
+        Hand the bot over to a new process connected to handoff_socket.
+        Updates are no longer read, and the offset of the next update is
+        sent right away as a JSON line, so the new process reads updates
+        while this one's handlers finish. Then the bot state is saved
+        and sent as JSON followed by the end of the stream
+
+        Args:
+            writer: Stream to the new process
+        '''
+        if self.closing:
+            writer.close()
+            return
+
+        self.stop_reading()
+        try:
+            writer.write(json.dumps({'offset': self.offset}).encode() + b'\n')
+            await writer.drain()
+        except OSError:
+            traceback.print_exc()
+
+        pending = await self.drain()
+        data = state.dump(self.coup_bot.sessions, self.offset)
+        # Saved before the stream ends, so the new process can restore
+        # it if the state doesn't get through
+        try:
+            self.persist()
+        except OSError:
+            traceback.print_exc()
+        try:
+            writer.write(json.dumps(data).encode())
+            await writer.drain()
+        except OSError:
+            traceback.print_exc()
+        finally:
+            writer.close()
+        self.close(pending)
+
+    async def take_over(self):
+        '''
+        Take over the bot from the process listening on handoff_socket,
+        if there's one. Updates are read, into the backlog, as soon as the
+        old process sends the offset, before the bot state arrives
+
+        Returns:
+            Wheter the bot state was received from the old process. If
+            it wasn't, the state should be restored from state_file
+        '''
+        if self.handoff_socket is None:
+            return False
+
+        try:
+            reader, writer = await asyncio.open_unix_connection(
+                self.handoff_socket
+            )
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+
+        try:
+            offset = await reader.readline()
+            if offset:
+                self.offset = json.loads(offset)['offset']
+                self.backlog = []
+                self.ingest = asyncio.get_event_loop().create_task(self.poll())
+            data = await reader.read()
+        except (OSError, ValueError, KeyError, TypeError):
+            traceback.print_exc()
+            return False
+        finally:
+            writer.close()
+        if not data:
+            return False
+
+        try:
+            self.coup_bot.sessions, _ = state.load(json.loads(data))
+        except (ValueError, KeyError, TypeError):
+            traceback.print_exc()
+            return False
+        return True
+
+
+async def serve(runtimes: Sequence[Awaitable[Runtime]]):
+    '''
+    Run several runtimes on the same event loop until SIGTERM or SIGINT
+    is received, which shuts all of them down, or until each one is
+    taken over by a new process. Runtimes are prepared concurrently, and
+    each one starts as soon as it's ready, e.g. once it took over its bot.
+    A runtime that fails to be prepared or to run is left out, without
+    stopping the others
+
+    Args:
+        runtimes: Awaitables giving the runtimes to be run
+    '''
+    loop = asyncio.get_event_loop()
+    started: List[Runtime] = []
+    stopping = False
+
+    def shutdown():
+        nonlocal stopping
+        stopping = True
+        for runtime in started:
+            loop.create_task(runtime.shutdown())
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, shutdown)
+
+    async def start(prepare: Awaitable[Runtime]):
+        try:
+            runtime = await prepare
+        except Exception:  # pylint: disable=broad-except
+            # e.g. a revoked token, the other bots keep running
+            traceback.print_exc()
+            return
+        if stopping:
+            # Asked to stop while it was being prepared, its state may
+            # have been taken over already, so it's saved
+            await runtime.shutdown()
+            return
+        started.append(runtime)
+        try:
+            await runtime.run()
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc()
+            await runtime.shutdown()
+
+    await asyncio.gather(*(start(prepare) for prepare in runtimes))
@@ -0,0 +1,172 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set, Tuple
+
+from .cards import Card
+from .game import Game
+
+
+@dataclass
+class SessionRegistry:
+    '''
+    The SessionRegistry keeps track of running games, the users playing
+    them and the messages holding their cards. Every index is updated
+    together, in constant time for each operation except remove_game,
+    which takes time proportional to the players of the game
+
+    There's no separate map from a game to its users: the game itself
+    is that index, through Game.player_ids and Game.participants. A set
+    of user ids per game would add more than 200 bytes to each game
+
+    Attributes:
+        games: Map from group id to its Game object. It's None until
+        the game is needed, so a game nobody joined takes no Game
+        user_games: Map from user id to its game
+        cards: Nested map from user id and message id to which card
+        that message represents. A user only gets an entry once a card
+        is dealt to them.
+        hands: Map from user id to the message holding their whole hand,
+        used instead of cards when each hand is a single message
+        group_messages: Map from group id to the (user id, message id)
+        pairs of every card or hand message sent in its game
+    '''
+    games: Dict[int, Optional[Game]] = field(default_factory=lambda: {})
+    user_games: Dict[int, Game] = field(default_factory=lambda: {})
+    cards: Dict[int, Dict[int, Card]] = field(default_factory=lambda: {})
+    hands: Dict[int, int] = field(default_factory=lambda: {})
+    group_messages: Dict[int, Set[Tuple[int, int]]] = field(
+        default_factory=lambda: {}
+    )
+
+    def add_game(self, group_id: int, game: Optional[Game] = None):
+        '''
+        Register a new game
+
+        Args:
+            group_id: Id of the group where the game is running
+            game: Game to be registered. If not given, it's created when
+            first needed
+        '''
+        self.games[group_id] = game
+
+    def game(self, group_id: int):
+        '''
+        Get the game running in a group, creating its Game if needed
+
+        Args:
+            group_id: Id of the group where the game is running
+        Returns:
+            The Game
+        '''
+        game = self.games[group_id]
+        if game is None:
+            game = self.games[group_id] = Game(group_id)
+        return game
+
+    def add_user(self, user_id: int, game: Game):
+        '''
+        Register a user as part of a game
+
+        Args:
+            user_id: Id of the user joining the game
+            game: Game the user is joining
+        '''
+        self.user_games[user_id] = game
+
+    def add_card(self, user_id: int, message_id: int, card: Card):
+        '''
+        Register the message holding a card dealt to a user
+
+        Args:
+            user_id: Id of the user holding the card
+            message_id: Id of the message representing the card
+            card: Card represented by the message
+        '''
+        group_id = self.user_games[user_id].group_id
+        self.cards.setdefault(user_id, {})[message_id] = card
+        self.group_messages.setdefault(group_id, set()).add(
+            (user_id, message_id)
+        )
+
+    def add_hand(self, user_id: int, message_id: int):
+        '''
+        Register the message holding the whole hand of a user
+
+        Args:
+            user_id: Id of the user holding the hand
+            message_id: Id of the message representing the hand
+        '''
+        group_id = self.user_games[user_id].group_id
+        self.hands[user_id] = message_id
+        self.group_messages.setdefault(group_id, set()).add(
+            (user_id, message_id)
+        )
+
+    def card(self, user_id: int, message_id: int):
+        '''
+        Get the card represented by a message
+
+        Args:
+            user_id: Id of the user holding the card
+            message_id: Id of the message representing the card
+        Returns:
+            The card represented by the message
+        '''
+        return self.cards[user_id][message_id]
+
+    def remove_card(self, user_id: int, message_id: int):
+        '''
+        Forget the message holding a card
+
+        Args:
+            user_id: Id of the user holding the card
+            message_id: Id of the message representing the card
+        Returns:
+            The card represented by the message
+        '''
+        group_id = self.user_games[user_id].group_id
+        card = self.cards[user_id].pop(message_id)
+        self.group_messages[group_id].discard((user_id, message_id))
+        return card
+
+    def remove_user(self, user_id: int):
+        '''
+        Remove a user, and the messages holding its cards, from its game
+
+        Args:
+            user_id: Id of the user to be removed
+        Returns:
+            Ids of the messages holding the user's cards or hand
+        '''
+        game = self.user_games.pop(user_id)
+
+        message_ids = list(self.cards.pop(user_id, {}).keys())
+        if user_id in self.hands:
+            message_ids.append(self.hands.pop(user_id))
+        messages = self.group_messages.get(game.group_id, set())
+        for message_id in message_ids:
+            messages.discard((user_id, message_id))
+
+        return message_ids
+
+    def remove_game(self, group_id: int):
+        '''
+        Remove a game along with its users and their cards
+
+        Args:
+            group_id: Id of the group where the game is running
+        Returns:
+            The (user id, message id) pairs of every card or hand still
+            held in the game
+        '''
+        game = self.games.pop(group_id)
+        if game is not None:
+            # Players that lost their cards are still registered until
+            # their messages are deleted, so participants are checked too
+            for user_id in set(game.participants + game.player_ids()):
+                if self.user_games.get(user_id) is not game:
+                    continue
+                del self.user_games[user_id]
+                self.cards.pop(user_id, None)
+                self.hands.pop(user_id, None)
+
+        return list(self.group_messages.pop(group_id, set()))
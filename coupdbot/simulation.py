@@ -0,0 +1,270 @@
+'''
+Monte Carlo simulation of how the deck behaves during games
+
+Each simulated game follows the card rules of Game: the deck starts with
+N_CARDS[n_players] // len(Card) copies of each influence, every player
+is dealt two cards, drawn cards come from the top of a shuffled deck and
+removed cards go back to the deck, which is shuffled again. As the deck
+is always shuffled, drawing is the same as picking a card with
+probability proportional to how many copies of it are in the deck, so
+decks and hands are stored as counts of each influence, for thousands
+of games at once.
+
+Every turn a random player that is still in the game does one of:
+
+- exchange: takes a foreign aid and, like an Embassador does, later
+  hides and removes as many cards as it drew. Until then the player
+  holds the extra cards and can't take another foreign aid
+- lose: hides and removes a card, losing an influence to a coup, an
+  assassination or a lost challenge
+- reveal: removes a card without hiding it, getting a new one, like
+  after winning a challenge
+- pass: does something that doesn't involve cards
+
+A game ends when one player is left, or when the deck runs out in the
+middle of a draw, which would make Game.deal_card fail.
+
+Needs NumPy, installed with the ``simulation`` extra. Run it with
+``python -m coupdbot.simulation``.
+'''
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from carl import command
+
+from .cards import Card
+from .game import N_CARDS
+
+
+ACTIONS = ('exchange', 'lose', 'reveal', 'pass')
+HAND_SIZE = 2
+
+
+@dataclass
+class Report:
+    '''
+    Class Report holds the results of simulating a table size
+
+    Attributes:
+        n_players: How many players were in each game
+        n_cards: How many cards the deck started with
+        n_games: How many games were simulated
+        exhausted: Fraction of games in which the deck ran out
+        turns: Average number of turns of the games
+        min_deck: Average of the smallest deck size seen in each game
+        pairs: Fraction of opening hands with two copies of an influence
+        influences: Average number of copies of each influence held
+        by the players, over every turn of every game
+    '''
+    n_players: int
+    n_cards: int
+    n_games: int
+    exhausted: float
+    turns: float
+    min_deck: float
+    pairs: float
+    influences: np.ndarray
+
+
+def draw(rng: np.random.Generator, counts: np.ndarray):
+    '''
+    Pick a random card from each row of counts
+
+    Args:
+        rng: Random number generator
+        counts: Array of shape (n, len(Card)) with how many copies of each
+        influence there are
+    Returns:
+        Indexes of the picked influences, -1 for rows with no cards
+    '''
+    total = counts.sum(axis=1)
+    threshold = rng.random(len(counts)) * total
+    card = (counts.cumsum(axis=1) <= threshold[:, None]).sum(axis=1)
+    return np.where(total > 0, card, -1)
+
+
+def simulate(
+        n_players: int,
+        n_games: int,
+        n_cards: int = None,
+        probabilities=(0.15, 0.3, 0.1, 0.45),
+        settle: float = 0.5,
+        max_turns: int = 500,
+        seed: int = None,
+):
+    '''
+    Simulate a batch of games with the same table size
+
+    Args:
+        n_players: How many players are in each game
+        n_games: How many games to simulate
+        n_cards: Size of the starting deck, defaults to N_CARDS
+        probabilities: Probability of each of ACTIONS on a turn
+        settle: Probability that a player holding foreign aid cards
+        removes them on a turn
+        max_turns: Turns after which a game is stopped
+        seed: Seed of the random number generator
+    Returns:
+        The Report of the simulation
+    '''
+    rng = np.random.default_rng(seed)
+    if n_cards is None:
+        n_cards = N_CARDS[n_players]
+    n_influences = len(Card)
+    thresholds = np.cumsum(probabilities) / np.sum(probabilities)
+
+    deck = np.full(
+        (n_games, n_influences), n_cards // n_influences, dtype=np.int16
+    )
+    hands = np.zeros((n_games, n_players, n_influences), dtype=np.int16)
+    pending = np.zeros((n_games, n_players), dtype=np.int16)
+    running = np.ones(n_games, dtype=bool)
+    exhausted = np.zeros(n_games, dtype=bool)
+    min_deck = deck.sum(axis=1)
+    turns = np.zeros(n_games, dtype=np.int32)
+    ids = np.arange(n_games)
+    results = {
+        'exhausted': np.zeros(n_games, dtype=bool),
+        'min_deck': np.zeros(n_games, dtype=min_deck.dtype),
+        'turns': np.zeros(n_games, dtype=np.int32),
+    }
+
+    def deal(games: np.ndarray, players: np.ndarray):
+        card = draw(rng, deck[games])
+        failed = games[card < 0]
+        exhausted[failed] = True
+        running[failed] = False
+
+        drawn = card >= 0
+        games, players, card = games[drawn], players[drawn], card[drawn]
+        deck[games, card] -= 1
+        hands[games, players, card] += 1
+        min_deck[games] = np.minimum(min_deck[games], deck[games].sum(axis=1))
+
+    def discard(games: np.ndarray, players: np.ndarray):
+        card = draw(rng, hands[games, players])
+        kept = card >= 0
+        games, players, card = games[kept], players[kept], card[kept]
+        hands[games, players, card] -= 1
+        np.add.at(deck, (games, card), 1)
+
+    everyone = np.arange(n_games)
+    for player in range(n_players):
+        for _ in range(HAND_SIZE):
+            deal(everyone, np.full(n_games, player))
+    pairs = (hands.max(axis=2) == HAND_SIZE).mean()
+
+    def store():
+        for name, values in (
+                ('exhausted', exhausted),
+                ('min_deck', min_deck),
+                ('turns', turns)):
+            results[name][ids] = values
+
+    held = np.zeros(n_influences)
+    held_turns = 0
+    for _ in range(max_turns):
+        if not running.all():
+            store()
+            deck, hands, pending, exhausted, min_deck, turns, ids = (
+                x[running] for x in
+                (deck, hands, pending, exhausted, min_deck, turns, ids)
+            )
+            running = running[running]
+        if not len(ids):
+            break
+
+        rows = np.arange(len(ids))
+        alive = hands.sum(axis=2) > 0
+        n_alive = alive.sum(axis=1)
+        running &= n_alive > 1
+
+        settling = (pending > 0) & (rng.random(pending.shape) < settle)
+        settling &= running[:, None]
+        for i in range(HAND_SIZE * 2):
+            discard(*np.nonzero(settling & (i < pending)))
+        pending[settling] = 0
+
+        rank = (rng.random(len(ids)) * n_alive).astype(np.int64)
+        player = (alive.cumsum(axis=1) <= rank[:, None]).sum(axis=1)
+        player = np.minimum(player, n_players - 1)
+        action = (rng.random(len(ids))[:, None] >= thresholds).sum(axis=1)
+
+        exchange = running & (action == 0) & (pending[rows, player] == 0)
+        hand_size = hands[rows, player].sum(axis=1)
+        for i in range(HAND_SIZE * 2):
+            games = np.flatnonzero(exchange & running & (i < hand_size))
+            deal(games, player[games])
+        exchange &= running
+        pending[rows[exchange], player[exchange]] = hand_size[exchange]
+
+        games = np.flatnonzero(running & ((action == 1) | (action == 2)))
+        discard(games, player[games])
+        still_alive = hands[rows, player].sum(axis=1) > 0
+        games = np.flatnonzero(running & (action == 2) & still_alive)
+        deal(games, player[games])
+
+        turns += running
+        held += hands[running].sum(axis=(0, 1))
+        held_turns += running.sum()
+
+    store()
+
+    return Report(
+        n_players=n_players,
+        n_cards=n_cards,
+        n_games=n_games,
+        exhausted=results['exhausted'].mean(),
+        turns=results['turns'].mean(),
+        min_deck=results['min_deck'].mean(),
+        pairs=pairs,
+        influences=held / max(held_turns, 1),
+    )
+
+
+@command
+def main(games: int = 100000, batch: int = 100000, seed: int = None):
+    '''
+    Simulate every table size in N_CARDS and print a report of each
+
+    Args:
+        games: How many games to simulate for each table size
+        batch: How many games to simulate at once
+        seed: Seed of the random number generator
+    '''
+    influences = ' '.join(f'{card.name[:4]:>5}' for card in Card)
+    print(
+        f'{"players":>7} {"cards":>5} {"exhaust%":>8} {"turns":>6} '
+        f'{"min deck":>8} {"pair%":>6} {influences}'
+    )
+
+    for n_players in sorted(N_CARDS):
+        if n_players < 2:
+            continue
+
+        start = time.perf_counter()
+        reports = []
+        for offset in range(0, games, batch):
+            reports.append(simulate(
+                n_players,
+                min(batch, games - offset),
+                seed=None if seed is None else seed + offset,
+            ))
+        weights = np.array([report.n_games for report in reports])
+
+        def mean(attribute):
+            values = np.array([getattr(r, attribute) for r in reports])
+            return np.average(values, axis=0, weights=weights)
+
+        held = ' '.join(f'{x:>5.2f}' for x in mean('influences'))
+        print(
+            f'{n_players:>7} {reports[0].n_cards:>5} '
+            f'{100 * mean("exhausted"):>8.3f} {mean("turns"):>6.1f} '
+            f'{mean("min_deck"):>8.2f} {100 * mean("pairs"):>6.2f} {held}'
+            f'  ({time.perf_counter() - start:.1f}s)'
+        )
+
+
+if __name__ == '__main__':
+    main.run()
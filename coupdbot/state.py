@@ -0,0 +1,149 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+from .cards import Card
+from .game import Game
+from .player import Player
+from .sessions import SessionRegistry
+
+
+def dump_game(game: Game):
+    '''
+    Convert a game to JSON-compatible data
+
+    Args:
+        game: Game to be converted
+    Returns:
+        A dict with the game data
+    '''
+    return {
+        'group_id': game.group_id,
+        'started': game.started,
+        'participants': list(game.participants),
+        'deck': list(game.deck),
+        'players': [
+            {
+                'id': player.id,
+                'name': player.name,
+                'cards': [int(card) for card in player.cards],
+                'hidden_cards': [int(card) for card in player.hidden_cards],
+                'foreign_aid_cards': player.foreign_aid_cards,
+            }
+            for player in game.players.values()
+        ],
+    }
+
+
+def load_game(data: Dict[str, Any]):
+    '''
+    Create a game from data made by dump_game
+
+    Args:
+        data: a dict with the game data
+    Returns:
+        The Game
+    '''
+    game = Game(
+        data['group_id'],
+        deck=bytearray(data['deck']),
+        started=data['started'],
+        participants=tuple(data.get('participants', ())),
+    )
+    for player in data['players']:
+        game.store(Player(
+            player['id'],
+            player['name'],
+            tuple(Card(card) for card in player['cards']),
+            tuple(Card(card) for card in player['hidden_cards']),
+            player['foreign_aid_cards'],
+        ))
+    return game
+
+
+def dump(sessions: SessionRegistry, offset: Optional[int] = None):
+    '''
+    Convert the bot state to JSON-compatible data
+
+    Args:
+        sessions: Registry of running games
+        offset: Id of the next update to be read
+    Returns:
+        A dict with the bot state
+    '''
+    return {
+        'offset': offset,
+        'games': [
+            dump_game(game if game is not None else Game(group_id))
+            for group_id, game in sessions.games.items()
+        ],
+        'users': {
+            user_id: game.group_id
+            for user_id, game in sessions.user_games.items()
+        },
+        'cards': {
+            user_id: {
+                message_id: int(card) for message_id, card in cards.items()
+            }
+            for user_id, cards in sessions.cards.items()
+        },
+        'hands': sessions.hands,
+    }
+
+
+def load(data: Dict[str, Any]):
+    '''
+    Rebuild the bot state from data made by dump
+
+    Args:
+        data: a dict with the bot state
+    Returns:
+        The SessionRegistry and the id of the next update to be read
+    '''
+    sessions = SessionRegistry()
+    for game_data in data['games']:
+        game = load_game(game_data)
+        if not game.started and not game.roster:
+            game = None
+        sessions.add_game(game_data['group_id'], game)
+
+    for user_id, group_id in data['users'].items():
+        sessions.add_user(int(user_id), sessions.game(group_id))
+
+    for user_id, cards in data['cards'].items():
+        for message_id, card in cards.items():
+            sessions.add_card(int(user_id), int(message_id), Card(card))
+
+    for user_id, message_id in data.get('hands', {}).items():
+        sessions.add_hand(int(user_id), message_id)
+
+    return sessions, data['offset']
+
+
+def save(path: str, sessions: SessionRegistry, offset: Optional[int] = None):
+    '''
+    Write the bot state to a file. The file is replaced at once, so
+    it's never left half written
+
+    Args:
+        path: Path of the file
+        sessions: Registry of running games
+        offset: Id of the next update to be read
+    '''
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as state_file:
+        json.dump(dump(sessions, offset), state_file)
+    os.replace(temporary, path)
+
+
+def read(path: str):
+    '''
+    Read the bot state from a file written by save
+
+    Args:
+        path: Path of the file
+    Returns:
+        The SessionRegistry and the id of the next update to be read
+    '''
+    with open(path) as state_file:
+        return load(json.load(state_file))
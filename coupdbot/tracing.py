@@ -0,0 +1,259 @@
+import asyncio
+import json
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class Span:
+    '''
+    Class Span records how long an operation took
+
+    Args:
+        tracer: Tracer the span will be exported to
+        trace_id: Id of the trace the span belongs to
+        name: Name of the operation
+
+    Attributes:
+        tracer: Tracer the span will be exported to
+        trace_id: Id of the trace the span belongs to
+        name: Name of the operation
+        span_id: Id of the span
+        parent_id: Id of the parent span, None for root spans
+        attributes: Extra information about the operation
+        start: When the operation started, in seconds since the epoch
+        duration: How many seconds the operation took
+        spans: Every finished span of the trace, kept by the root span
+    '''
+    tracer: 'Tracer'
+    trace_id: str
+    name: str
+    span_id: str = field(default_factory=lambda: f'{random.getrandbits(64):016x}')
+    parent_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=lambda: {})
+    start: float = field(default_factory=time.time)
+    duration: float = 0.0
+    spans: List['Span'] = field(default_factory=lambda: [], repr=False)
+
+    def to_dict(self):
+        '''
+        Convert the span to JSON-compatible data
+
+        Returns:
+            A dict with the span data
+        '''
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': self.duration * 1000,
+            'attributes': self.attributes,
+        }
+
+
+CURRENT_SPAN: ContextVar[Optional[Span]] = ContextVar(
+    'current_span', default=None
+)
+
+
+@dataclass
+class Tracer:
+    '''
+    The Tracer samples updates and writes the spans of their handling
+    to a JSON lines file, one span per line. Spans are buffered and
+    written at most every flush_interval seconds, outside the event loop
+
+    Args:
+        path: Path of the file the spans are written to
+
+    Attributes:
+        path: Path of the file the spans are written to
+        sample_rate: Fraction of the updates that are traced
+        flush_interval: Seconds spans wait in the buffer
+        pending: Lines of the spans not written yet
+        flushing: Task writing the buffer, while there's one
+    '''
+    path: str
+    sample_rate: float = 0.01
+    flush_interval: float = 1.0
+    pending: List[str] = field(default_factory=lambda: [])
+    flushing: Optional[asyncio.Task] = None
+
+    def wrap(self, route: Callable):
+        '''
+        Wrap a route so a sample of the messages it handles is traced
+
+        Args:
+            route: Function that handles a message, made by routes
+        Returns:
+            The wrapped route
+        '''
+        @wraps(route)
+        async def traced_route(message, *args, **kwargs):
+            if random.random() >= self.sample_rate:
+                return await route(message, *args, **kwargs)
+
+            text = message.get('text', message.get('data')) or ''
+            root = Span(self, f'{random.getrandbits(128):032x}', 'update')
+            root.attributes['command'] = (text.split(maxsplit=1) or [''])[0][:64]
+            with self.activate(root):
+                return await route(message, *args, **kwargs)
+
+        return traced_route
+
+    @contextmanager
+    def activate(self, span: Span):
+        '''
+        Make a span the current one while the block runs. Once a root
+        span finishes, its trace is exported
+
+        Args:
+            span: Span to be activated
+        '''
+        token = CURRENT_SPAN.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as error:
+            span.attributes['error'] = repr(error)
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            CURRENT_SPAN.reset(token)
+            span.spans.append(span)
+            if span.parent_id is None:
+                self.export(span.spans)
+
+    def export(self, spans: List[Span]):
+        '''
+        Buffer spans to be appended to the trace file
+
+        Args:
+            spans: Spans to be written
+        '''
+        self.pending.extend(json.dumps(span.to_dict()) + '\n' for span in spans)
+        if self.flushing is None:
+            self.flushing = asyncio.get_event_loop().create_task(
+                self.flush_later()
+            )
+
+    async def flush_later(self):
+        '''
+        Write the buffer every flush_interval seconds until it stays empty
+        '''
+        try:
+            while self.pending:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            self.flushing = None
+
+    async def flush(self):
+        '''
+        Append the buffered spans to the trace file, outside the event loop
+        '''
+        lines, self.pending = ''.join(self.pending), []
+        if lines:
+            await asyncio.get_event_loop().run_in_executor(
+                None, self.write, lines
+            )
+
+    def write(self, lines: str):
+        '''
+        Append lines to the trace file
+
+        Args:
+            lines: Lines to be written
+        '''
+        with open(self.path, 'a') as trace_file:
+            trace_file.write(lines)
+
+    async def close(self):
+        '''
+        Write every buffered span, waiting for the current write if any
+        '''
+        if self.flushing is not None:
+            await self.flushing
+        await self.flush()
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    '''
+    Record a child span of the current span. Nothing is recorded when
+    the update being handled isn't traced
+
+    Args:
+        name: Name of the operation
+        attributes: Extra information about the operation
+    '''
+    parent = CURRENT_SPAN.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(
+        parent.tracer,
+        parent.trace_id,
+        name,
+        parent_id=parent.span_id,
+        attributes=attributes,
+        spans=parent.spans,
+    )
+    with parent.tracer.activate(child):
+        yield child
+
+
+def traced(name: str):
+    '''
+    Decorate a function so each call is recorded as a span
+
+    Args:
+        name: Name of the span
+    Returns:
+        The decorator
+    '''
+    def decorator(function: Callable):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if CURRENT_SPAN.get() is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@dataclass
+class TracedBot:
+    '''
+    Class TracedBot wraps a Bot so each API call made while handling a
+    traced update is recorded as a span
+
+    Args:
+        bot: Bot handler
+    '''
+    bot: Any
+
+    def __getattr__(self, name: str):
+        method = getattr(self.bot, name)
+        if not asyncio.iscoroutinefunction(method):
+            return method
+
+        @wraps(method)
+        async def call(*args, **kwargs):
+            if CURRENT_SPAN.get() is None:
+                return await method(*args, **kwargs)
+            with span(f'bot.{name}'):
+                return await method(*args, **kwargs)
+
+        return call
@@ -0,0 +1,22 @@
+from dataclasses import fields
+
+
+def slotted(cls):
+    '''
+    Recreate a dataclass using __slots__ instead of a per-instance
+    __dict__, like dataclass(slots=True) does from Python 3.10 on
+
+    Args:
+        cls: Dataclass to be recreated
+    Returns:
+        The slotted version of the class
+    '''
+    cls_dict = dict(cls.__dict__)
+    names = tuple(f.name for f in fields(cls))
+    for name in names:
+        cls_dict.pop(name, None)
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    cls_dict['__slots__'] = names
+
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
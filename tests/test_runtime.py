@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from benchmarks.fake_bot import FakeBot, command
+from coupdbot.__main__ import routes
+from coupdbot.bot import CoupBot
+from coupdbot.history import History
+from coupdbot.runtime import ALLOWED_UPDATES, Runtime, serve
+
+
+class UpdatesBot(FakeBot):
+    '''
+    FakeBot whose getUpdates returns the given batches of updates, then
+    waits until cancelled
+    '''
+    def __init__(self, batches):
+        super().__init__()
+        self.batches = list(batches)
+        self.requests = []
+
+    async def getUpdates(self, **kwargs):
+        self.requests.append(kwargs)
+        if self.batches:
+            return self.batches.pop(0)
+        await asyncio.sleep(3600)
+        return []
+
+
+class PollTest(unittest.IsolatedAsyncioTestCase):
+    async def poll(self, batches):
+        bot = UpdatesBot(batches)
+        coup_bot = CoupBot(bot, 'coupdbot')
+        runtime = Runtime(coup_bot, routes(coup_bot))
+        run = asyncio.ensure_future(runtime.run())
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await runtime.shutdown()
+        await run
+        return bot, runtime
+
+    async def test_non_message_update_is_skipped(self):
+        my_chat_member = {
+            'update_id': 1,
+            'my_chat_member': {'chat': {'id': -1, 'type': 'group'}},
+        }
+        new_game = {'update_id': 2, 'message': command('/new_game', 1, -1)}
+        bot, runtime = await self.poll([[my_chat_member], [new_game]])
+
+        self.assertEqual(runtime.offset, 3)
+        self.assertIn(-1, runtime.coup_bot.sessions.games)
+        self.assertEqual([request['offset'] for request in bot.requests][:3], [None, 2, 3])
+
+    async def test_only_commands_are_asked_for(self):
+        bot, _ = await self.poll([])
+
+        self.assertEqual(bot.requests[0]['allowed_updates'], ALLOWED_UPDATES)
+
+
+class DrainTest(unittest.IsolatedAsyncioTestCase):
+    async def test_history_write_is_drained(self):
+        with tempfile.TemporaryDirectory() as directory:
+            history = History(os.path.join(directory, 'history.db'))
+            coup_bot = CoupBot(UpdatesBot([]), 'coupdbot', history=history)
+            runtime = Runtime(coup_bot, routes(coup_bot))
+            run = asyncio.ensure_future(runtime.run())
+            await asyncio.sleep(0)
+
+            coup_bot.spawn(asyncio.sleep(0.05))
+            coup_bot.spawn(history.record(-1, [1, 2], 1))
+            await runtime.shutdown()
+            await run
+
+            self.assertEqual(coup_bot.background, set())
+            self.assertEqual(history.read(-1, 1), (1, 1, 1))
+            history.connection.close()
+
+
+class ServeTest(unittest.IsolatedAsyncioTestCase):
+    async def test_failing_bot_does_not_stop_the_others(self):
+        coup_bot = CoupBot(UpdatesBot([]), 'coupdbot')
+        runtime = Runtime(coup_bot, routes(coup_bot))
+
+        async def failing():
+            raise RuntimeError('revoked token')
+
+        async def working():
+            return runtime
+
+        async def stop():
+            await asyncio.sleep(0.05)
+            await runtime.shutdown()
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            await asyncio.gather(serve([failing(), working()]), stop())
+
+        self.assertIn('revoked token', stderr.getvalue())
+        self.assertTrue(runtime.closed.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()